@@ -0,0 +1,33 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.services.profiling import is_admin, profile_store
+
+router = APIRouter()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Ohne konfiguriertes ``PROFILE_ADMIN_TOKEN`` gibt es die Admin-Endpunkte nicht."""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=404, detail="Nicht gefunden.")
+
+
+@router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles() -> List[dict]:
+    """Die letzten Profiling-Aufzeichnungen, neueste zuerst."""
+    return profile_store.recent()
+
+
+@router.get(
+    "/admin/profiles/{request_id}",
+    dependencies=[Depends(require_admin)],
+    response_class=PlainTextResponse,
+)
+def get_profile(request_id: str) -> str:
+    """Collapsed Stacks einer Aufzeichnung, direkt für ``flamegraph.pl`` oder speedscope."""
+    capture = profile_store.get(request_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="Profil nicht gefunden.")
+    return capture["collapsed"]
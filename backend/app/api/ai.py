@@ -1,50 +1,162 @@
 import json
 import os
-from typing import Any, Dict, List
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, List, Optional, Tuple
 
 import httpx
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.db.database import get_db
+from app.db.database import SessionLocal, get_db
 from app.models.message import Message
+from app.services.admission import AdmissionGate, QueueFullError
+from app.services.message_search import search_messages
+from app.services.message_writer import MessageWriter
+from app.services.prompt_cache import message_to_dict, prompt_cache, prompt_key
 
 router = APIRouter()
 OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.1")
+OLLAMA_TIMEOUT = float(os.environ.get("OLLAMA_TIMEOUT", "30"))
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_MAX_CONNECTIONS = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "10"))
+OLLAMA_MAX_KEEPALIVE = int(os.environ.get("OLLAMA_MAX_KEEPALIVE", "5"))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.environ.get("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+OLLAMA_MAX_IN_FLIGHT = int(os.environ.get("OLLAMA_MAX_IN_FLIGHT", "2"))
+OLLAMA_MAX_QUEUE = int(os.environ.get("OLLAMA_MAX_QUEUE", "16"))
+OLLAMA_RETRY_AFTER = int(os.environ.get("OLLAMA_RETRY_AFTER", "5"))
 
+# App-weiter HTTP-Client mit Keep-Alive, wird im Lifespan von app.main verwaltet
+_ollama_client: Optional[httpx.AsyncClient] = None
+# Begrenzt gleichzeitige Generierungen und bündelt identische Prompts
+ollama_gate = AdmissionGate(OLLAMA_MAX_IN_FLIGHT, OLLAMA_MAX_QUEUE, OLLAMA_RETRY_AFTER)
+# Schreibt Chat-Nachrichten gebündelt im Hintergrund, wird im Lifespan gestartet/gestoppt
+message_writer = MessageWriter(SessionLocal)
+
+
+class EmptyAnswerError(Exception):
+    """Ollama hat keinen verwertbaren Text geliefert; solche Antworten werden weder gecacht noch gespeichert."""
+
+    def __init__(self) -> None:
+        super().__init__("Keine Antwort vom Modell erhalten.")
+
+
+def create_ollama_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=OLLAMA_HOST,
+        timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=OLLAMA_MAX_KEEPALIVE,
+            keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def get_ollama_client() -> httpx.AsyncClient:
+    """Liefert den geteilten Client; ohne Lifespan (z.B. in Skripten) wird er bei Bedarf angelegt."""
+    global _ollama_client
+    if _ollama_client is None or _ollama_client.is_closed:
+        _ollama_client = create_ollama_client()
+    return _ollama_client
+
+
+async def close_ollama_client() -> None:
+    global _ollama_client
+    if _ollama_client is not None:
+        await _ollama_client.aclose()
+        _ollama_client = None
+
+
+async def answer_prompt(prompt: str) -> dict:
+    """
+    Holt eine Antwort über ``ollama_gate`` und speichert sie. Gleichzeitige identische
+    Prompts teilen sich Upstream-Aufruf und Nachrichtenzeile; nur der führende Aufruf
+    liefert ``cached: False``, die übrigen zählen als Cache-Treffer.
+    """
+    led = False
+
+    async def generate() -> dict:
+        nonlocal led
+        led = True
+        return _save_message(prompt, await _generate(prompt))
+
+    result = await ollama_gate.run(prompt_key(prompt, OLLAMA_MODEL), generate)
+    if not led:
+        prompt_cache.count_coalesced()
+    return {**result, "cached": not led}
+
+
+def _queue_full(exc: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="KI ist ausgelastet, bitte später erneut versuchen.",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def _generate(prompt: str) -> str:
+    client = get_ollama_client()
+    payload = {"model": OLLAMA_MODEL, "prompt": prompt}
+    response = await client.post("/api/generate", json=payload)
+    response.raise_for_status()
+    try:
+        data: Any = response.json()
+    except ValueError:
+        text_content = response.text.strip()
+        chunks: List[str] = []
+        for line in text_content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                chunk = json.loads(line)
+                if isinstance(chunk, dict) and chunk.get("response"):
+                    chunks.append(str(chunk["response"]))
+            except ValueError:
+                chunks.append(line)
+        answer = "".join(chunks)
+    else:
+        answer = ""
+        if isinstance(data, dict):
+            value = data.get("response") or data.get("output") or data.get("data")
+            answer = value if isinstance(value, str) else ""
+
+    # Platzhalter wie "Keine Antwort erhalten." oder das rohe JSON würden sonst für die
+    # volle TTL als Antwort ausgeliefert und in messages gespeichert
+    answer = answer.strip()
+    if not answer:
+        raise EmptyAnswerError()
+    return answer
+
+
+def _save_message(content: str, response: str) -> dict:
+    """
+    Reiht Frage/Antwort beim Write-Behind-Writer ein und legt sie im Antwort-Cache ab.
+    Die ID ist erst nach dem Schreiben bekannt und wird daher als ``None`` geliefert.
+    """
+    created_at = datetime.now(timezone.utc)
+    message_writer.enqueue({
+        "content": content,
+        "response": response,
+        "created_at": created_at,
+        "model": OLLAMA_MODEL,
+        "prompt_key": prompt_key(content, OLLAMA_MODEL),
+    })
+    result = {
+        "id": None,
+        "message": content,
+        "response": response,
+        "created_at": created_at.isoformat(),
+    }
+    prompt_cache.store(content, OLLAMA_MODEL, result)
+    return result
 
-async def call_ollama(prompt: str) -> str:
-    """Spricht die Ollama-API an und liefert nur den Textinhalt zurück."""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        payload = {"model": "llama3.1", "prompt": prompt}
-        response = await client.post(f"{OLLAMA_HOST}/api/generate", json=payload)
-        response.raise_for_status()
-        try:
-            data: Dict[str, Any] = response.json()
-            return (
-                data.get("response")
-                or data.get("output")
-                or data.get("data")
-                or str(data)
-            )
-        except ValueError:
-            text_content = response.text.strip()
-            if not text_content:
-                return "Keine Antwort erhalten."
-
-            chunks: List[str] = []
-            for line in text_content.splitlines():
-                if not line.strip():
-                    continue
-                try:
-                    chunk = json.loads(line)
-                    if isinstance(chunk, dict) and chunk.get("response"):
-                        chunks.append(str(chunk["response"]))
-                except ValueError:
-                    chunks.append(line)
-
-            cleaned = "".join(chunks).strip()
-            return cleaned or text_content
+
+def _lookup_cached(message: str) -> Optional[dict]:
+    with SessionLocal() as db:
+        return prompt_cache.lookup(db, message, OLLAMA_MODEL)
 
 
 @router.get("/ai/chat")
@@ -53,24 +165,160 @@ async def chat(message: str, db: Session = Depends(get_db)):
     if not message.strip():
         raise HTTPException(status_code=400, detail="Nachricht darf nicht leer sein.")
 
+    cached = await run_in_threadpool(prompt_cache.lookup, db, message, OLLAMA_MODEL)
+    if cached is not None:
+        return {**cached, "cached": True}
+
     try:
-        response = await call_ollama(message)
-    except httpx.HTTPError as exc:
+        return await answer_prompt(message)
+    except QueueFullError as exc:
+        raise _queue_full(exc) from exc
+    except (httpx.HTTPError, EmptyAnswerError) as exc:
         raise HTTPException(status_code=502, detail=str(exc)) from exc
 
-    entry = Message(content=message, response=response)
-    db.add(entry)
-    db.commit()
-    db.refresh(entry)
 
+@router.get("/ai/cache/stats")
+def cache_stats() -> dict:
+    """Trefferquoten und Füllstand des Antwort-Caches."""
+    return prompt_cache.stats()
+
+
+@router.get("/ai/queue/stats")
+def queue_stats() -> dict:
+    """Auslastung, Wartezeiten und Upstream-Latenz vor Ollama sowie der Nachrichten-Writer."""
+    return {**ollama_gate.stats(), "message_writer": message_writer.stats()}
+
+
+async def stream_ollama(prompt: str) -> AsyncIterator[str]:
+    """Ruft Ollama mit ``stream: true`` auf und liefert die Textstücke, sobald sie eintreffen."""
+    client = get_ollama_client()
+    payload = {"model": OLLAMA_MODEL, "prompt": prompt, "stream": True}
+    async with client.stream("POST", "/api/generate", json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            try:
+                chunk = json.loads(line)
+            except ValueError:
+                yield line
+                continue
+            if chunk.get("response"):
+                yield str(chunk["response"])
+            if chunk.get("done"):
+                break
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.get("/ai/chat/stream")
+async def chat_stream(message: str):
+    """Chat-Endpunkt, der die Antwort als Server-Sent Events Token für Token ausliefert."""
+    if not message.strip():
+        raise HTTPException(status_code=400, detail="Nachricht darf nicht leer sein.")
+    if ollama_gate.is_full():
+        raise _queue_full(QueueFullError(ollama_gate.retry_after))
+
+    async def events() -> AsyncIterator[str]:
+        cached = await run_in_threadpool(_lookup_cached, message)
+        if cached is not None:
+            yield _sse({"response": cached["response"]})
+            yield _sse({"id": cached["id"], "created_at": cached["created_at"], "cached": True}, event="done")
+            return
+
+        chunks: List[str] = []
+        try:
+            async with ollama_gate.slot():
+                async for chunk in stream_ollama(message):
+                    chunks.append(chunk)
+                    yield _sse({"response": chunk})
+        except QueueFullError as exc:
+            yield _sse({"detail": "KI ist ausgelastet.", "retry_after": exc.retry_after}, event="error")
+            return
+        except httpx.HTTPError as exc:
+            yield _sse({"detail": str(exc)}, event="error")
+            return
+
+        answer = "".join(chunks).strip()
+        if not answer:
+            yield _sse({"detail": str(EmptyAnswerError())}, event="error")
+            return
+        # Erst nach vollständigem Stream speichern (Write-Behind, kein fsync im Event-Loop)
+        saved = _save_message(message, answer)
+        yield _sse({"id": saved["id"], "created_at": saved["created_at"], "cached": False}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+MESSAGE_FIELDS = ("id", "message", "response", "created_at")
+
+
+@router.get("/ai/messages")
+def list_messages(
+    limit: int = Query(20, ge=1, le=100),
+    before_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Chat-Verlauf, neueste zuerst; weiter blättern mit ``before_id``, ``fields`` schränkt die Felder ein."""
+    selected = list(MESSAGE_FIELDS)
+    if fields is not None:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in MESSAGE_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unbekannte Felder: {', '.join(unknown)}")
+        selected = [field for field in MESSAGE_FIELDS if field == "id" or field in requested]
+
+    query = db.query(Message)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    entries = query.order_by(Message.id.desc()).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    items = [
+        {field: value for field, value in message_to_dict(entry).items() if field in selected}
+        for entry in entries[:limit]
+    ]
     return {
-        "id": entry.id,
-        "message": entry.content,
-        "response": entry.response,
-        "created_at": entry.created_at.isoformat() if entry.created_at else None,
+        "items": items,
+        "next_before_id": items[-1]["id"] if has_more else None,
     }
 
 
+def _parse_search_cursor(cursor: str) -> Tuple[Optional[float], int]:
+    try:
+        rank, message_id = cursor.rsplit(":", 1)
+        return (float(rank) if rank else None), int(message_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor.")
 
 
+@router.get("/ai/messages/search")
+def search_history(
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Volltextsuche im Chat-Verlauf, relevanteste Treffer zuerst; ``next_cursor`` ist der
+    ``cursor`` der nächsten Seite.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Suchbegriff darf nicht leer sein.")
 
+    after = _parse_search_cursor(cursor) if cursor else None
+    items = search_messages(db, q, limit + 1, after)
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        # repr() gibt den bm25-Wert verlustfrei wieder, sonst bräche der Keyset-Vergleich
+        next_cursor = f"{'' if last['rank'] is None else repr(last['rank'])}:{last['id']}"
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,103 @@
+from typing import Dict, List
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.api.games import GameResponse, _game_to_response, _games_with_names
+from app.api.players import PlayerResponse
+from app.api.tournaments import TournamentResponse, load_pairings, tournament_to_response
+from app.db.database import get_db
+from app.models.game import Game
+from app.models.player import Player
+from app.models.tournament import Tournament
+from app.services.changes import CHANGES_PAGE_SIZE, GAME, PLAYER, TOURNAMENT, changes_since, latest_seq
+
+router = APIRouter()
+
+
+class DeletedIds(BaseModel):
+    players: List[int]
+    tournaments: List[int]
+    games: List[int]
+
+
+class ChangesResponse(BaseModel):
+    since: int
+    next: int
+    # Neueste Sequenz auf dem Server; Einstieg für Clients, die gerade alles geladen haben
+    latest: int
+    has_more: bool
+    # Marke liegt hinter dem Server-Stand (z.B. neu aufgesetzte DB): Client lädt alles neu
+    reset: bool
+    players: List[PlayerResponse]
+    tournaments: List[TournamentResponse]
+    games: List[GameResponse]
+    deleted: DeletedIds
+
+
+def _load_players(db: Session, ids: List[int]) -> List[Player]:
+    return db.query(Player).filter(Player.id.in_(ids)).order_by(Player.id).all() if ids else []
+
+
+def _load_tournaments(db: Session, ids: List[int]) -> List[dict]:
+    if not ids:
+        return []
+    tournaments = db.query(Tournament).filter(Tournament.id.in_(ids)).order_by(Tournament.id).all()
+    pairings = load_pairings(db, [tournament.id for tournament in tournaments])
+    return [tournament_to_response(tournament, pairings[tournament.id]) for tournament in tournaments]
+
+
+def _load_games(db: Session, ids: List[int]) -> List[dict]:
+    if not ids:
+        return []
+    games = _games_with_names(db).filter(Game.id.in_(ids)).order_by(Game.id).all()
+    return [
+        _game_to_response(game)
+        for game in games
+        if game.pairing1 is not None and game.pairing2 is not None
+    ]
+
+
+@router.get("/changes", response_model=ChangesResponse)
+def list_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(CHANGES_PAGE_SIZE, ge=1, le=CHANGES_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """
+    Geänderte Spieler, Turniere und Spiele seit Sequenz ``since``, je Entität nur der
+    aktuelle Stand. ``next`` ist das ``since`` für den nächsten Abruf; bei ``has_more``
+    sofort weiter abrufen.
+    """
+    latest = latest_seq(db)
+    if since > latest:
+        return {
+            "since": since, "next": latest, "latest": latest, "has_more": False, "reset": True,
+            "players": [], "tournaments": [], "games": [],
+            "deleted": {"players": [], "tournaments": [], "games": []},
+        }
+
+    changes = changes_since(db, since, limit)
+    players = _load_players(db, changes.upserted[PLAYER])
+    tournaments = _load_tournaments(db, changes.upserted[TOURNAMENT])
+    games = _load_games(db, changes.upserted[GAME])
+
+    # Nicht mehr vorhandene Zeilen (z.B. später gelöscht) als gelöscht melden
+    deleted: Dict[str, List[int]] = {}
+    for entity, found in ((PLAYER, players), (TOURNAMENT, tournaments), (GAME, games)):
+        present = {row.id if isinstance(row, Player) else row["id"] for row in found}
+        missing = [entity_id for entity_id in changes.upserted[entity] if entity_id not in present]
+        deleted[f"{entity}s"] = sorted(set(changes.deleted[entity]) | set(missing))
+
+    return {
+        "since": since,
+        "next": changes.next_seq,
+        "latest": latest,
+        "has_more": changes.has_more,
+        "reset": False,
+        "players": players,
+        "tournaments": tournaments,
+        "games": games,
+        "deleted": deleted,
+    }
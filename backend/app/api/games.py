@@ -1,17 +1,35 @@
-from typing import List, Optional
+import asyncio
+import functools
+import logging
+from typing import List, Optional, Set
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session, aliased, joinedload
 
-from app.db.database import get_db
+from app.api.tournaments import TournamentResponse, tournament_to_response, load_pairings
+from app.db.database import SessionLocal, get_db
 from app.models.game import Game
 from app.models.pairing import Pairing
+from app.models.player import Player
 from app.models.tournament import Tournament
+from app.services.changes import GAME, record_changes
+from app.services.game_writer import (
+    GAME_WRITE_QUEUE, GameNotFound, GameResult, GameResultWriter, InvalidWinner,
+)
+from app.services.http_cache import versioned_json_response
+from app.services.live_scores import RESYNC, scoreboard_hub
+from app.services.player_scores import record_game_result, record_game_results
+from app.services.versioning import bump_tournament, tournament_scope
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+game_writer = GameResultWriter(SessionLocal)
+
 
 class GameUpdate(BaseModel):
     winner_pairing_id: Optional[int] = None
@@ -32,6 +50,11 @@ class GameResponse(BaseModel):
         from_attributes = True
 
 
+class GameResultUpdate(BaseModel):
+    game_id: int
+    winner_pairing_id: Optional[int] = None
+
+
 class ScoreResponse(BaseModel):
     pairing_id: int
     pairing_names: str
@@ -40,143 +63,403 @@ class ScoreResponse(BaseModel):
     games_won: int
 
 
-@router.get("/tournaments/{tournament_id}/games", response_model=List[GameResponse])
-def list_games(tournament_id: int, db: Session = Depends(get_db)):
-    """Listet alle Spiele eines Turniers auf."""
-    tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
-    if not tournament:
-        raise HTTPException(status_code=404, detail="Turnier nicht gefunden.")
-    
-    games = db.query(Game).filter(Game.tournament_id == tournament_id).order_by(
+class GameResultsResponse(BaseModel):
+    games: List[GameResponse]
+    scores: List[ScoreResponse]
+
+
+class TournamentSnapshotResponse(BaseModel):
+    tournament: TournamentResponse
+    games: List[GameResponse]
+    scores: List[ScoreResponse]
+
+
+def _games_with_names(db: Session):
+    """Query für Spiele inkl. beider Paarungen und Spieler in einem einzigen SELECT."""
+    return db.query(Game).options(
+        joinedload(Game.pairing1).joinedload(Pairing.player1),
+        joinedload(Game.pairing1).joinedload(Pairing.player2),
+        joinedload(Game.pairing2).joinedload(Pairing.player1),
+        joinedload(Game.pairing2).joinedload(Pairing.player2),
+    )
+
+
+def _pairing_names(pairing: Pairing) -> str:
+    return f"{pairing.player1.name} & {pairing.player2.name}"
+
+
+def _game_response(game: Game, pairing1_names: str, pairing2_names: str) -> dict:
+    winner_names = None
+    if game.winner_pairing_id == game.pairing1_id:
+        winner_names = pairing1_names
+    elif game.winner_pairing_id == game.pairing2_id:
+        winner_names = pairing2_names
+
+    return {
+        "id": game.id,
+        "tournament_id": game.tournament_id,
+        "pairing1_id": game.pairing1_id,
+        "pairing1_names": pairing1_names,
+        "pairing2_id": game.pairing2_id,
+        "pairing2_names": pairing2_names,
+        "round_number": game.round_number,
+        "winner_pairing_id": game.winner_pairing_id,
+        "winner_names": winner_names
+    }
+
+
+def _game_to_response(game: Game) -> dict:
+    """Baut die Antwort für ein Spiel aus bereits geladenen Paarungen/Spielern."""
+    return _game_response(game, _pairing_names(game.pairing1), _pairing_names(game.pairing2))
+
+
+def load_game_responses(db: Session, tournament_id: int) -> List[dict]:
+    """Lädt alle Spiele eines Turniers als Antwort-Dicts mit konstanter Query-Anzahl."""
+    games = _games_with_names(db).filter(Game.tournament_id == tournament_id).order_by(
         Game.round_number, Game.id
     ).all()
-    
-    result = []
-    for game in games:
-        db.refresh(game)
-        pairing1 = db.query(Pairing).filter(Pairing.id == game.pairing1_id).first()
-        pairing2 = db.query(Pairing).filter(Pairing.id == game.pairing2_id).first()
-        
-        if pairing1 and pairing2:
-            db.refresh(pairing1)
-            db.refresh(pairing2)
-            pairing1_names = f"{pairing1.player1.name} & {pairing1.player2.name}"
-            pairing2_names = f"{pairing2.player1.name} & {pairing2.player2.name}"
-            
-            winner_names = None
-            if game.winner_pairing_id:
-                winner_pairing = db.query(Pairing).filter(Pairing.id == game.winner_pairing_id).first()
-                if winner_pairing:
-                    db.refresh(winner_pairing)
-                    winner_names = f"{winner_pairing.player1.name} & {winner_pairing.player2.name}"
-            
-            result.append({
-                "id": game.id,
-                "tournament_id": game.tournament_id,
-                "pairing1_id": game.pairing1_id,
-                "pairing1_names": pairing1_names,
-                "pairing2_id": game.pairing2_id,
-                "pairing2_names": pairing2_names,
-                "round_number": game.round_number,
-                "winner_pairing_id": game.winner_pairing_id,
-                "winner_names": winner_names
-            })
-    
-    return result
+    return [
+        _game_to_response(game)
+        for game in games
+        if game.pairing1 is not None and game.pairing2 is not None
+    ]
+
+
+@router.get("/tournaments/{tournament_id}/games", response_model=List[GameResponse])
+def list_games(tournament_id: int, request: Request, db: Session = Depends(get_db)):
+    """Listet alle Spiele eines Turniers auf."""
+    def build() -> List[dict]:
+        tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
+        if not tournament:
+            raise HTTPException(status_code=404, detail="Turnier nicht gefunden.")
+        return load_game_responses(db, tournament_id)
+
+    return versioned_json_response(
+        request, db, tournament_scope(tournament_id), List[GameResponse], build
+    )
 
 
 @router.patch("/games/{game_id}", response_model=GameResponse)
 def update_game(game_id: int, game_update: GameUpdate, db: Session = Depends(get_db)):
     """Aktualisiert das Ergebnis eines Spiels."""
-    game = db.query(Game).filter(Game.id == game_id).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Spiel nicht gefunden.")
-    
-    # Reset erlauben
-    if game_update.winner_pairing_id is None:
-        game.winner_pairing_id = None
+    if GAME_WRITE_QUEUE:
+        # Schreibt der Single-Writer; erst nach dessen Commit geht es hier weiter
+        try:
+            game_writer.submit(game_id, game_update.winner_pairing_id).result()
+        except GameNotFound as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except InvalidWinner as e:
+            raise HTTPException(status_code=400, detail=str(e))
     else:
-        # Prüfe, ob die Gewinner-Paarung eine der beiden Spiel-Paarungen ist
-        if game_update.winner_pairing_id not in [game.pairing1_id, game.pairing2_id]:
-            raise HTTPException(
-                status_code=400,
-                detail="Die Gewinner-Paarung muss eine der beiden Spiel-Paarungen sein."
-            )
-        game.winner_pairing_id = game_update.winner_pairing_id
-    db.commit()
-    db.refresh(game)
-    
-    # Lade vollständige Informationen
-    pairing1 = db.query(Pairing).filter(Pairing.id == game.pairing1_id).first()
-    pairing2 = db.query(Pairing).filter(Pairing.id == game.pairing2_id).first()
-    
-    if pairing1 and pairing2:
-        db.refresh(pairing1)
-        db.refresh(pairing2)
-        pairing1_names = f"{pairing1.player1.name} & {pairing1.player2.name}"
-        pairing2_names = f"{pairing2.player1.name} & {pairing2.player2.name}"
-        
-        winner_names = None
-        if game.winner_pairing_id:
-            winner_pairing = db.query(Pairing).filter(Pairing.id == game.winner_pairing_id).first()
-            if winner_pairing:
-                db.refresh(winner_pairing)
-                winner_names = f"{winner_pairing.player1.name} & {winner_pairing.player2.name}"
+        game = db.query(Game).filter(Game.id == game_id).first()
+        if not game:
+            raise HTTPException(status_code=404, detail="Spiel nicht gefunden.")
         
-        return {
-            "id": game.id,
-            "tournament_id": game.tournament_id,
-            "pairing1_id": game.pairing1_id,
-            "pairing1_names": pairing1_names,
-            "pairing2_id": game.pairing2_id,
-            "pairing2_names": pairing2_names,
-            "round_number": game.round_number,
-            "winner_pairing_id": game.winner_pairing_id,
-            "winner_names": winner_names
-        }
+        previous_winner_id = game.winner_pairing_id
+        # Reset erlauben
+        if game_update.winner_pairing_id is None:
+            game.winner_pairing_id = None
+        else:
+            # Prüfe, ob die Gewinner-Paarung eine der beiden Spiel-Paarungen ist
+            if game_update.winner_pairing_id not in [game.pairing1_id, game.pairing2_id]:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Die Gewinner-Paarung muss eine der beiden Spiel-Paarungen sein."
+                )
+            game.winner_pairing_id = game_update.winner_pairing_id
+        record_game_result(db, game, previous_winner_id)
+        record_changes(db, GAME, [game_id])
+        bump_tournament(db, game.tournament_id)
+        db.commit()
+    
+    # Lade vollständige Informationen (eine Query inkl. Paarungen und Spieler)
+    game = _games_with_names(db).filter(Game.id == game_id).first()
+    if game and game.pairing1 is not None and game.pairing2 is not None:
+        response = _game_to_response(game)
+        scoreboard_hub.publish(game.tournament_id, [response])
+        return response
     
     raise HTTPException(status_code=500, detail="Fehler beim Laden der Spielinformationen.")
 
 
+def compute_scoreboard(db: Session, tournament_id: int) -> List[dict]:
+    """
+    Ermittelt Punkte, gespielte und gewonnene Spiele aller Paarungen eines Turniers
+    in einem einzigen GROUP-BY-Statement (Sortierung: Punkte absteigend, dann Paarungs-ID).
+    """
+    player1 = aliased(Player)
+    player2 = aliased(Player)
+    games_won = func.coalesce(
+        func.sum(case((Game.winner_pairing_id == Pairing.id, 1), else_=0)), 0
+    )
+    games_played = func.coalesce(
+        func.sum(case((Game.winner_pairing_id.isnot(None), 1), else_=0)), 0
+    )
+
+    rows = (
+        db.query(
+            Pairing.id,
+            player1.name,
+            player2.name,
+            games_won.label("games_won"),
+            games_played.label("games_played"),
+        )
+        .join(player1, Pairing.player1_id == player1.id)
+        .join(player2, Pairing.player2_id == player2.id)
+        .outerjoin(
+            Game,
+            and_(
+                Game.tournament_id == Pairing.tournament_id,
+                or_(Game.pairing1_id == Pairing.id, Game.pairing2_id == Pairing.id),
+            ),
+        )
+        .filter(Pairing.tournament_id == tournament_id)
+        .group_by(Pairing.id, player1.name, player2.name)
+        .order_by(games_won.desc(), Pairing.id)
+        .all()
+    )
+
+    return [
+        {
+            "pairing_id": pairing_id,
+            "pairing_names": f"{player1_name} & {player2_name}",
+            "points": int(won),  # Jeder Sieg = 1 Punkt
+            "games_played": int(played),
+            "games_won": int(won)
+        }
+        for pairing_id, player1_name, player2_name, won, played in rows
+    ]
+
+
+def scoreboard_from_games(pairings: List[dict], games: List[Game]) -> List[dict]:
+    """Wie ``compute_scoreboard``, aber aus bereits geladenen Paarungen und Spielen (ohne Query)."""
+    won = {pairing["id"]: 0 for pairing in pairings}
+    played = dict(won)
+    for game in games:
+        if game.winner_pairing_id is None:
+            continue
+        for pairing_id in (game.pairing1_id, game.pairing2_id):
+            if pairing_id in played:
+                played[pairing_id] += 1
+        if game.winner_pairing_id in won:
+            won[game.winner_pairing_id] += 1
+
+    ordered = sorted(pairings, key=lambda pairing: (-won[pairing["id"]], pairing["id"]))
+    return [
+        {
+            "pairing_id": pairing["id"],
+            "pairing_names": f"{pairing['player1_name']} & {pairing['player2_name']}",
+            "points": won[pairing["id"]],  # Jeder Sieg = 1 Punkt
+            "games_played": played[pairing["id"]],
+            "games_won": won[pairing["id"]]
+        }
+        for pairing in ordered
+    ]
+
+
+def load_snapshot(db: Session, tournament_id: int) -> dict:
+    """
+    Turnier, Paarungen, Spiele und Punktestand aus einem gemeinsamen Laden:
+    je eine Query für Turnier, Paarungen (inkl. Spieler) und Spiele.
+    """
+    tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Turnier nicht gefunden.")
+
+    pairings = load_pairings(db, [tournament_id])[tournament_id]
+    names = {pairing["id"]: f"{pairing['player1_name']} & {pairing['player2_name']}" for pairing in pairings}
+    games = db.query(Game).filter(Game.tournament_id == tournament_id).order_by(
+        Game.round_number, Game.id
+    ).all()
+
+    return {
+        "tournament": tournament_to_response(tournament, pairings),
+        "games": [
+            _game_response(game, names[game.pairing1_id], names[game.pairing2_id])
+            for game in games
+            if game.pairing1_id in names and game.pairing2_id in names
+        ],
+        "scores": scoreboard_from_games(pairings, games),
+    }
+
+
+@router.get("/tournaments/{tournament_id}/snapshot", response_model=TournamentSnapshotResponse)
+def get_tournament_snapshot(tournament_id: int, request: Request, db: Session = Depends(get_db)):
+    """Alles für die Turnieransicht in einem Request; ETag/Cache wie ``/games`` und ``/scores``."""
+    return versioned_json_response(
+        request, db, tournament_scope(tournament_id), TournamentSnapshotResponse,
+        lambda: load_snapshot(db, tournament_id),
+    )
+
+
+def refresh_live_scoreboards(db: Session, scopes: Set[str]) -> None:
+    """
+    Listener für den Invalidierungs-Bus: lädt beobachtete Turniere, die ein anderer
+    Worker geändert hat, neu. Das Publish ist idempotent, eigene Änderungen werden
+    also nicht doppelt verschickt.
+    """
+    for tournament_id in scoreboard_hub.watched():
+        if tournament_scope(tournament_id) not in scopes:
+            continue
+        try:
+            snapshot = load_snapshot(db, tournament_id)
+        except HTTPException:
+            continue  # Turnier wurde gelöscht
+        scoreboard_hub.publish(tournament_id, snapshot["games"])
+    db.rollback()
+
+
+def _forward_done(tournament_id: int, task: asyncio.Task) -> None:
+    """Holt das Ergebnis des Sende-Tasks ab; ein beim Senden getrennter Client ist kein Fehler."""
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None and not isinstance(error, (WebSocketDisconnect, RuntimeError, OSError)):
+        logger.warning("Live-Kanal für Turnier %s beendet: %r", tournament_id, error)
+
+
+@router.websocket("/tournaments/{tournament_id}/live")
+async def live_scoreboard(websocket: WebSocket, tournament_id: int, db: Session = Depends(get_db)):
+    """
+    Live-Kanal eines Turniers: zuerst ``{"type": "snapshot", games, scores}``, danach bei
+    jedem Ergebnis nur ``{"type": "update", games, scores}`` mit den geänderten Zeilen.
+    """
+    await websocket.accept()
+    queue = scoreboard_hub.subscribe(tournament_id)
+    try:
+        try:
+            snapshot = await run_in_threadpool(load_snapshot, db, tournament_id)
+        except HTTPException:
+            await websocket.close(code=4404, reason="Turnier nicht gefunden.")
+            return
+        finally:
+            # Verbindung nicht für die Dauer des Abos im Pool blockieren
+            db.close()
+        await websocket.send_json(
+            scoreboard_hub.initialize(tournament_id, snapshot["games"], snapshot["scores"])
+        )
+
+        async def forward() -> None:
+            while True:
+                message = await queue.get()
+                if message is RESYNC:
+                    message = scoreboard_hub.state(tournament_id) or message
+                await websocket.send_json(message)
+
+        forwarder = asyncio.ensure_future(forward())
+        forwarder.add_done_callback(functools.partial(_forward_done, tournament_id))
+        try:
+            # Der Handler selbst wartet auf das Trennen und endet dann regulär
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            forwarder.cancel()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        scoreboard_hub.unsubscribe(tournament_id, queue)
+
+
 @router.get("/tournaments/{tournament_id}/scores", response_model=List[ScoreResponse])
-def get_tournament_scores(tournament_id: int, db: Session = Depends(get_db)):
+def get_tournament_scores(tournament_id: int, request: Request, db: Session = Depends(get_db)):
     """Ermittelt die Punktestände eines Turniers."""
+    def build() -> List[dict]:
+        tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
+        if not tournament:
+            raise HTTPException(status_code=404, detail="Turnier nicht gefunden.")
+        return compute_scoreboard(db, tournament_id)
+
+    return versioned_json_response(
+        request, db, tournament_scope(tournament_id), List[ScoreResponse], build
+    )
+
+
+@router.patch("/tournaments/{tournament_id}/games", response_model=GameResultsResponse)
+def update_games(tournament_id: int, results: List[GameResultUpdate], db: Session = Depends(get_db)):
+    """Trägt mehrere Spielergebnisse eines Turniers in einer Transaktion ein."""
     tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
     if not tournament:
         raise HTTPException(status_code=404, detail="Turnier nicht gefunden.")
     
-    # Hole alle Paarungen des Turniers
-    pairings = db.query(Pairing).filter(Pairing.tournament_id == tournament_id).all()
+    if GAME_WRITE_QUEUE:
+        return _update_games_queued(tournament_id, results, db)
     
-    scores = []
-    for pairing in pairings:
-        db.refresh(pairing)
-        pairing_names = f"{pairing.player1.name} & {pairing.player2.name}"
-        
-        # Zähle gewonnene Spiele (als pairing1 oder pairing2)
-        games_won = db.query(Game).filter(
-            Game.tournament_id == tournament_id,
-            Game.winner_pairing_id == pairing.id
-        ).count()
-        
-        # Zähle gespielte Spiele
-        games_played = db.query(Game).filter(
-            Game.tournament_id == tournament_id,
-            ((Game.pairing1_id == pairing.id) | (Game.pairing2_id == pairing.id)),
-            Game.winner_pairing_id.isnot(None)
-        ).count()
-        
-        scores.append({
-            "pairing_id": pairing.id,
-            "pairing_names": pairing_names,
-            "points": games_won,  # Jeder Sieg = 1 Punkt
-            "games_played": games_played,
-            "games_won": games_won
-        })
+    # Alle Spiele inkl. Paarungen einmal laden und vollständig validieren, bevor geschrieben wird
+    games = {
+        game.id: game
+        for game in _games_with_names(db).filter(Game.tournament_id == tournament_id)
+    }
+    seen = set()
+    for result in results:
+        game = games.get(result.game_id)
+        if game is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Spiel {result.game_id} gehört nicht zu diesem Turnier."
+            )
+        if result.game_id in seen:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Spiel {result.game_id} ist mehrfach angegeben."
+            )
+        seen.add(result.game_id)
+        if result.winner_pairing_id is not None and result.winner_pairing_id not in [game.pairing1_id, game.pairing2_id]:
+            raise HTTPException(
+                status_code=400,
+                detail="Die Gewinner-Paarung muss eine der beiden Spiel-Paarungen sein."
+            )
     
-    # Sortiere nach Punkten (absteigend)
-    scores.sort(key=lambda x: x["points"], reverse=True)
-    return scores
-
+    changes = []
+    for result in results:
+        game = games[result.game_id]
+        changes.append((game, game.winner_pairing_id))
+        game.winner_pairing_id = result.winner_pairing_id
+    
+    pairing_players = {
+        pairing.id: (pairing.player1_id, pairing.player2_id)
+        for game in games.values()
+        for pairing in (game.pairing1, game.pairing2)
+    }
+    record_game_results(db, changes, pairing_players)
+    record_changes(db, GAME, [game.id for game, _ in changes])
+    # Antworten vor dem Commit bauen, danach wären die Objekte abgelaufen
+    updated_games = [_game_to_response(game) for game, _ in changes]
+    bump_tournament(db, tournament_id)
+    db.commit()
+    scoreboard_hub.publish(tournament_id, updated_games)
+    
+    return {
+        "games": updated_games,
+        "scores": compute_scoreboard(db, tournament_id)
+    }
 
 
+def _update_games_queued(tournament_id: int, results: List[GameResultUpdate], db: Session) -> dict:
+    """Sammel-Eintragung über den Single-Writer: ein Auftrag, alle Ergebnisse oder keines."""
+    seen = set()
+    for result in results:
+        if result.game_id in seen:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Spiel {result.game_id} ist mehrfach angegeben."
+            )
+        seen.add(result.game_id)
+    
+    try:
+        game_writer.submit_many(
+            [GameResult(result.game_id, result.winner_pairing_id) for result in results], tournament_id
+        ).result()
+    except GameNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidWinner as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Nach dem Commit des Writers lesen, in der Reihenfolge der Eingabe
+    games = {game.id: game for game in _games_with_names(db).filter(Game.id.in_(seen))}
+    updated_games = [_game_to_response(games[result.game_id]) for result in results]
+    scoreboard_hub.publish(tournament_id, updated_games)
+    
+    return {
+        "games": updated_games,
+        "scores": compute_scoreboard(db, tournament_id)
+    }
@@ -1,28 +1,42 @@
-from typing import List
+import base64
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
 from app.models.player import Player
 from app.models.pairing import Pairing
+from app.services.changes import DELETE, PLAYER, record_changes
+from app.services.versioning import GLOBAL_SCOPE, bump_versions
 
 router = APIRouter()
 
 
 class PlayerCreate(BaseModel):
     name: str
+    active: bool = True
+
+
+class PlayerUpdate(BaseModel):
+    active: bool
 
 
 class PlayerResponse(BaseModel):
     id: int
     name: str
+    active: bool
 
     class Config:
         from_attributes = True
 
 
+class PlayerPage(BaseModel):
+    items: List[PlayerResponse]
+    next_cursor: Optional[str]
+
+
 @router.post("/players", response_model=PlayerResponse)
 def create_player(player: PlayerCreate, db: Session = Depends(get_db)):
     """Erstellt einen neuen Spieler."""
@@ -34,17 +48,51 @@ def create_player(player: PlayerCreate, db: Session = Depends(get_db)):
     if existing:
         raise HTTPException(status_code=400, detail="Spieler mit diesem Namen existiert bereits.")
     
-    new_player = Player(name=player.name.strip())
+    new_player = Player(name=player.name.strip(), active=player.active)
     db.add(new_player)
+    db.flush()
+    record_changes(db, PLAYER, [new_player.id])
+    bump_versions(db, GLOBAL_SCOPE)
     db.commit()
     db.refresh(new_player)
     return new_player
 
 
-@router.get("/players", response_model=List[PlayerResponse])
-def list_players(db: Session = Depends(get_db)):
-    """Listet alle Spieler auf."""
-    return db.query(Player).order_by(Player.name).all()
+def _encode_cursor(name: str) -> str:
+    return base64.urlsafe_b64encode(name.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor.")
+
+
+@router.get("/players", response_model=Union[List[PlayerResponse], PlayerPage])
+def list_players(
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Listet Spieler nach Namen sortiert auf. Mit ``limit`` seitenweise als
+    ``{"items", "next_cursor"}``; ``next_cursor`` ist der ``cursor`` der nächsten Seite.
+    """
+    query = db.query(Player)
+    if cursor:
+        # Keyset auf den eindeutigen Namen
+        query = query.filter(Player.name > _decode_cursor(cursor))
+    query = query.order_by(Player.name)
+    if limit is None:
+        return query.all()
+
+    players = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(players) > limit:
+        players = players[:limit]
+        next_cursor = _encode_cursor(players[-1].name)
+    return {"items": players, "next_cursor": next_cursor}
 
 
 @router.get("/players/{player_id}", response_model=PlayerResponse)
@@ -56,6 +104,21 @@ def get_player(player_id: int, db: Session = Depends(get_db)):
     return player
 
 
+@router.patch("/players/{player_id}", response_model=PlayerResponse)
+def update_player(player_id: int, update: PlayerUpdate, db: Session = Depends(get_db)):
+    """Setzt einen Spieler aktiv/inaktiv; inaktive Spieler werden nicht mehr eingeplant."""
+    player = db.query(Player).filter(Player.id == player_id).first()
+    if not player:
+        raise HTTPException(status_code=404, detail="Spieler nicht gefunden.")
+
+    player.active = update.active
+    record_changes(db, PLAYER, [player_id])
+    bump_versions(db, GLOBAL_SCOPE)
+    db.commit()
+    db.refresh(player)
+    return player
+
+
 @router.delete("/players/{player_id}")
 def delete_player(player_id: int, db: Session = Depends(get_db)):
     """Löscht einen Spieler."""
@@ -74,6 +137,8 @@ def delete_player(player_id: int, db: Session = Depends(get_db)):
         )
     
     db.delete(player)
+    record_changes(db, PLAYER, [player_id], DELETE)
+    bump_versions(db, GLOBAL_SCOPE)
     db.commit()
     return {"message": "Spieler gelöscht"}
 
@@ -1,15 +1,16 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session, aliased
 
 from app.db.database import get_db
-from app.models.game import Game
-from app.models.pairing import Pairing
 from app.models.player import Player
+from app.models.player_score import PlayerTournamentScore
 from app.models.tournament import Tournament
+from app.services.http_cache import versioned_json_response
+from app.services.versioning import GLOBAL_SCOPE
 
 router = APIRouter()
 
@@ -22,47 +23,48 @@ class YearlyScoreResponse(BaseModel):
 
 
 @router.get("/statistics/yearly/{year}", response_model=List[YearlyScoreResponse])
-def get_yearly_scores(year: int, db: Session = Depends(get_db)):
+def get_yearly_scores(year: int, request: Request, db: Session = Depends(get_db)):
     """Ermittelt die Jahresübersicht aller Spieler für ein bestimmtes Jahr."""
-    # Hole alle Turniere des Jahres
-    tournaments = db.query(Tournament).filter(Tournament.year == year).all()
-    if not tournaments:
+    return versioned_json_response(
+        request, db, GLOBAL_SCOPE, List[YearlyScoreResponse], lambda: _yearly_scores(db, year)
+    )
+
+
+def _yearly_scores(db: Session, year: int) -> List[dict]:
+    # Eine Query über das Punkte-Rollup (Index auf year, player_id)
+    total_points = func.coalesce(func.sum(PlayerTournamentScore.points), 0)
+    rows = (
+        db.query(
+            Player.id,
+            Player.name,
+            total_points,
+            func.count(PlayerTournamentScore.tournament_id),
+        )
+        .outerjoin(
+            PlayerTournamentScore,
+            and_(
+                PlayerTournamentScore.player_id == Player.id,
+                PlayerTournamentScore.year == year,
+            ),
+        )
+        .group_by(Player.id, Player.name)
+        .order_by(total_points.desc(), Player.id)
+        .all()
+    )
+
+    # Keine Turniere im Jahr → leere Übersicht
+    if not any(tournaments_played for _, _, _, tournaments_played in rows):
         return []
-    
-    tournament_ids = [t.id for t in tournaments]
-    
-    # Hole alle Spieler
-    players = db.query(Player).all()
-    
-    results = []
-    for player in players:
-        # Finde alle Paarungen, an denen dieser Spieler beteiligt war
-        pairings = db.query(Pairing).filter(
-            Pairing.tournament_id.in_(tournament_ids),
-            ((Pairing.player1_id == player.id) | (Pairing.player2_id == player.id))
-        ).all()
-        
-        pairing_ids = [p.id for p in pairings]
-        
-        # Zähle alle gewonnenen Spiele dieser Paarungen
-        total_points = db.query(Game).filter(
-            Game.tournament_id.in_(tournament_ids),
-            Game.winner_pairing_id.in_(pairing_ids)
-        ).count()
-        
-        # Zähle Turniere, an denen der Spieler teilgenommen hat
-        tournaments_played = len(set(p.tournament_id for p in pairings))
-        
-        results.append({
-            "player_id": player.id,
-            "player_name": player.name,
-            "total_points": total_points,
+
+    return [
+        {
+            "player_id": player_id,
+            "player_name": player_name,
+            "total_points": int(points),
             "tournaments_played": tournaments_played
-        })
-    
-    # Sortiere nach Punkten (absteigend)
-    results.sort(key=lambda x: x["total_points"], reverse=True)
-    return results
+        }
+        for player_id, player_name, points, tournaments_played in rows
+    ]
 
 
 @router.get("/statistics/player/{player_id}/yearly/{year}")
@@ -72,11 +74,28 @@ def get_player_yearly_details(player_id: int, year: int, db: Session = Depends(g
     if not player:
         raise HTTPException(status_code=404, detail="Spieler nicht gefunden.")
     
-    tournaments = db.query(Tournament).filter(Tournament.year == year).order_by(
-        Tournament.month
-    ).all()
-    
-    tournament_ids = [t.id for t in tournaments]
+    # Alle Turniere des Jahres inkl. Rollup-Zeile und Partner in einer Query
+    partner = aliased(Player)
+    rows = (
+        db.query(
+            Tournament.id,
+            Tournament.name,
+            Tournament.month,
+            partner.name,
+            PlayerTournamentScore.points,
+        )
+        .outerjoin(
+            PlayerTournamentScore,
+            and_(
+                PlayerTournamentScore.tournament_id == Tournament.id,
+                PlayerTournamentScore.player_id == player_id,
+            ),
+        )
+        .outerjoin(partner, partner.id == PlayerTournamentScore.partner_id)
+        .filter(Tournament.year == year)
+        .order_by(Tournament.month)
+        .all()
+    )
     
     details = {
         "player_id": player.id,
@@ -85,57 +104,15 @@ def get_player_yearly_details(player_id: int, year: int, db: Session = Depends(g
         "tournaments": []
     }
     
-    for tournament in tournaments:
-        # Finde Paarungen dieses Spielers in diesem Turnier
-        pairings = db.query(Pairing).filter(
-            Pairing.tournament_id == tournament.id,
-            ((Pairing.player1_id == player_id) | (Pairing.player2_id == player_id))
-        ).all()
-        
-        tournament_points = 0
-        for pairing in pairings:
-            games_won = db.query(Game).filter(
-                Game.tournament_id == tournament.id,
-                Game.winner_pairing_id == pairing.id
-            ).count()
-            tournament_points += games_won
-        
-        # Finde Partner
-        partner_name = None
-        if pairings:
-            pairing = pairings[0]
-            db.refresh(pairing)
-            if pairing.player1_id == player_id:
-                partner_name = pairing.player2.name
-            else:
-                partner_name = pairing.player1.name
-        
+    for tournament_id, tournament_name, month, partner_name, points in rows:
         details["tournaments"].append({
-            "tournament_id": tournament.id,
-            "tournament_name": tournament.name,
-            "month": tournament.month,
+            "tournament_id": tournament_id,
+            "tournament_name": tournament_name,
+            "month": month,
             "partner": partner_name,
-            "points": tournament_points
+            "points": points or 0
         })
     
     # Berechne Gesamtpunkte
-    pairing_ids = []
-    for tournament in tournaments:
-        pairings = db.query(Pairing).filter(
-            Pairing.tournament_id == tournament.id,
-            ((Pairing.player1_id == player_id) | (Pairing.player2_id == player_id))
-        ).all()
-        pairing_ids.extend([p.id for p in pairings])
-    
-    total_points = db.query(Game).filter(
-        Game.tournament_id.in_(tournament_ids),
-        Game.winner_pairing_id.in_(pairing_ids)
-    ).count() if pairing_ids else 0
-    
-    details["total_points"] = total_points
+    details["total_points"] = sum(t["points"] for t in details["tournaments"])
     return details
-
-
-
-
-
@@ -1,14 +1,21 @@
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 
 from app.db.database import get_db
 from app.models.player import Player
 from app.models.tournament import Tournament
 from app.models.pairing import Pairing
 from app.models.game import Game
+from app.services.changes import DELETE, TOURNAMENT, record_changes, record_tournament_games
+from app.services.http_cache import Page, versioned_json_response
+from app.services.player_scores import delete_tournament_scores, init_tournament_scores
+from app.services.rotation import MIN_PLAYERS, matchups, normalize_roster, round_table, select_round, used_partnerships
+from app.services.versioning import GLOBAL_SCOPE, bump_tournament, bump_versions, tournament_scope
 
 router = APIRouter()
 
@@ -17,6 +24,12 @@ class TournamentCreate(BaseModel):
     name: str
     year: int
     month: int
+    # Anwesende Spieler des Monats; ohne Angabe alle aktiven Spieler
+    player_ids: Optional[List[int]] = None
+
+
+class TournamentBulkCreate(BaseModel):
+    tournaments: List[TournamentCreate]
 
 
 class PairingResponse(BaseModel):
@@ -41,155 +54,290 @@ class TournamentResponse(BaseModel):
         from_attributes = True
 
 
+class TournamentPage(BaseModel):
+    items: List[TournamentResponse]
+    next_cursor: Optional[str]
+
+
+GAMES_PER_MATCHUP = 3
+
+
 def generate_pairing_rounds(player_ids: List[int]) -> List[List[tuple]]:
     """
-    Generiert 7 Runden mit je 4 disjunkten Paarungen (Round-Robin für Partner),
-    so dass über 7 Monate jede Paarung genau einmal vorkommt.
+    Generiert alle Runden mit disjunkten Paarungen (Round-Robin für Partner), so dass
+    über die Runden jede Paarung genau einmal vorkommt. Bei ungerader Spielerzahl
+    setzt pro Runde ein Spieler aus.
     """
-    if len(player_ids) != 8:
-        raise ValueError("Es müssen genau 8 Spieler vorhanden sein.")
-    
-    # Stabil sortieren für deterministische Ergebnisse
-    players = sorted(player_ids)
-    n = len(players)
-    rounds: List[List[tuple]] = []
-
-    # Circle-Method für Partner-Round-Robin (nicht Matches)
-    for _ in range(n - 1):  # 7 Runden
-        round_pairs: List[tuple] = []
-        for i in range(n // 2):
-            p1 = players[i]
-            p2 = players[n - 1 - i]
-            pair = (min(p1, p2), max(p1, p2))
-            round_pairs.append(pair)
-        rounds.append(round_pairs)
-        # Rotation (fixiere den ersten)
-        players = [players[0]] + [players[-1]] + players[1:-1]
-
-    return rounds
+    return [list(round_.pairs) for round_ in round_table(normalize_roster(player_ids))]
 
 
 def select_round_for_month(player_ids: List[int], year: int, month: int) -> List[tuple]:
     """
-    Wählt basierend auf Monat eine der 7 vorberechneten Runden (0-basiert).
-    Monat 1 → Runde 0, Monat 2 → Runde 1, ... Monat 7 → Runde 6, Monat 8 → wieder Runde 0, etc.
+    Wählt basierend auf Monat eine der vorberechneten Runden (0-basiert).
+    Monat 1 → Runde 0, Monat 2 → Runde 1, ... bei 8 Spielern Monat 8 → wieder Runde 0.
     """
-    rounds = generate_pairing_rounds(player_ids)
-    round_index = (month - 1) % len(rounds)
-    return rounds[round_index]
+    return list(select_round(player_ids, month).pairs)
 
 
-@router.post("/tournaments", response_model=TournamentResponse)
-def create_tournament(tournament: TournamentCreate, db: Session = Depends(get_db)):
-    """Erstellt ein neues Turnier mit automatischen Paarungen."""
-    # Prüfe, ob Turnier für diesen Monat bereits existiert
-    existing = db.query(Tournament).filter(
-        Tournament.year == tournament.year,
-        Tournament.month == tournament.month
-    ).first()
-    if existing:
+def _load_players_for_tournament(db: Session) -> Tuple[Dict[int, str], List[int]]:
+    """Lädt alle Spieler (ID → Name) und die IDs der aktiven Spieler in einer Query."""
+    players: Dict[int, str] = {}
+    active: List[int] = []
+    for player_id, name, is_active in db.query(Player.id, Player.name, Player.active):
+        players[player_id] = name
+        if is_active:
+            active.append(player_id)
+    return players, active
+
+
+def _attending_players(tournament: TournamentCreate, players: Dict[int, str], active: List[int]) -> List[int]:
+    """Teilnehmer des Monats: explizit angegeben oder alle aktiven Spieler."""
+    if tournament.player_ids is None:
+        attending = active
+    else:
+        unknown = sorted(set(tournament.player_ids) - set(players))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unbekannte Spieler: {unknown}")
+        attending = tournament.player_ids
+    if len(set(attending)) < MIN_PLAYERS:
         raise HTTPException(
             status_code=400,
-            detail=f"Turnier für {tournament.month}/{tournament.year} existiert bereits."
+            detail=f"Es müssen mindestens {MIN_PLAYERS} Spieler teilnehmen. Aktuell: {len(set(attending))}"
         )
-    
-    # Prüfe, ob genau 8 Spieler vorhanden sind
-    players = db.query(Player).all()
-    if len(players) != 8:
+    return attending
+
+
+def _insert_pairings(db: Session, tournament_id: int, pairs: List[tuple]) -> List[int]:
+    """Fügt die Paarungen eines Turniers in einem Statement ein und liefert ihre IDs in Reihenfolge von ``pairs``."""
+    rows = [
+        {"tournament_id": tournament_id, "player1_id": p1_id, "player2_id": p2_id}
+        for p1_id, p2_id in pairs
+    ]
+    columns = (Pairing.id, Pairing.player1_id, Pairing.player2_id)
+    if db.get_bind().dialect.insert_executemany_returning:
+        inserted = db.execute(insert(Pairing).returning(*columns), rows).all()
+    else:
+        db.execute(insert(Pairing), rows)
+        inserted = db.execute(select(*columns).where(Pairing.tournament_id == tournament_id)).all()
+    # Innerhalb eines Turniers ist jedes Spielerpaar eindeutig
+    ids_by_pair = {(p1_id, p2_id): pairing_id for pairing_id, p1_id, p2_id in inserted}
+    return [ids_by_pair[pair] for pair in pairs]
+
+
+def _is_duplicate_month(error: IntegrityError) -> bool:
+    """Nur die Verletzung von uq_tournaments_year_month (SQLite nennt Spalten, PostgreSQL den Index)."""
+    message = str(error.orig)
+    return "uq_tournaments_year_month" in message or "tournaments.year, tournaments.month" in message
+
+
+def _insert_tournament(
+    db: Session,
+    tournament: TournamentCreate,
+    players: Dict[int, str],
+    active: List[int],
+) -> dict:
+    """
+    Legt Turnier, Paarungen, Spiele und Rollup-Zeilen mit Bulk-Inserts an (ohne Commit)
+    und liefert die Antwort; Spielernamen stammen aus dem bereits geladenen ``players``.
+    """
+    attending = _attending_players(tournament, players, active)
+
+    # Eindeutigkeit von (year, month) sichert der Unique-Index uq_tournaments_year_month
+    try:
+        tournament_id = db.execute(
+            insert(Tournament).values(
+                name=tournament.name,
+                year=tournament.year,
+                month=tournament.month
+            )
+        ).inserted_primary_key[0]
+    except IntegrityError as e:
+        if not _is_duplicate_month(e):
+            raise
+        db.rollback()
         raise HTTPException(
             status_code=400,
-            detail=f"Es müssen genau 8 Spieler vorhanden sein. Aktuell: {len(players)}"
-        )
-    
-    # Erstelle Turnier
-    new_tournament = Tournament(
-        name=tournament.name,
-        year=tournament.year,
-        month=tournament.month
-    )
-    db.add(new_tournament)
-    db.flush()
-    
-    # Generiere Paarungen für den Monat (rotierend)
-    player_ids = [p.id for p in players]
-    selected_pairs = select_round_for_month(player_ids, tournament.year, tournament.month)
-
-    created_pairings = []
-    for p1_id, p2_id in selected_pairs:
-        pairing = Pairing(
-            tournament_id=new_tournament.id,
-            player1_id=p1_id,
-            player2_id=p2_id
+            detail=f"Turnier für {tournament.month}/{tournament.year} existiert bereits."
         )
-        db.add(pairing)
-        created_pairings.append(pairing)
     
-    db.flush()
+    # Generiere Paarungen für den Monat (rotierend, möglichst ohne Wiederholung im Jahr)
+    used_pairs = used_partnerships(db, tournament.year, tournament.month)
+    selected_pairs = list(select_round(attending, tournament.month, used_pairs).pairs)
+    pairing_ids = _insert_pairings(db, tournament_id, selected_pairs)
     
     # Erstelle alle Spiele: Jede Paarung spielt 3 mal gegen jede andere Paarung
-    for i, pairing1 in enumerate(created_pairings):
-        for j, pairing2 in enumerate(created_pairings):
-            if i < j:  # Vermeide Duplikate und Spiele gegen sich selbst
-                # 3 Spiele pro Paarung
-                for round_num in range(1, 4):
-                    game = Game(
-                        tournament_id=new_tournament.id,
-                        pairing1_id=pairing1.id,
-                        pairing2_id=pairing2.id,
-                        round_number=round_num,
-                        winner_pairing_id=None
-                    )
-                    db.add(game)
+    game_rows = [
+        {
+            "tournament_id": tournament_id,
+            "pairing1_id": pairing1_id,
+            "pairing2_id": pairing2_id,
+            "round_number": round_num,
+            "winner_pairing_id": None
+        }
+        for pairing1_id, pairing2_id in matchups(pairing_ids)
+        for round_num in range(1, GAMES_PER_MATCHUP + 1)
+    ]
+    if game_rows:
+        db.execute(insert(Game), game_rows)
     
+    init_tournament_scores(db, tournament_id, tournament.year, selected_pairs)
+    record_changes(db, TOURNAMENT, [tournament_id])
+    record_tournament_games(db, tournament_id)
+    
+    return {
+        "id": tournament_id,
+        "name": tournament.name,
+        "year": tournament.year,
+        "month": tournament.month,
+        "pairings": [
+            {
+                "id": pairing_id,
+                "player1_id": p1_id,
+                "player1_name": players[p1_id],
+                "player2_id": p2_id,
+                "player2_name": players[p2_id]
+            }
+            for pairing_id, (p1_id, p2_id) in zip(pairing_ids, selected_pairs)
+        ]
+    }
+
+
+@router.post("/tournaments", response_model=TournamentResponse)
+def create_tournament(tournament: TournamentCreate, db: Session = Depends(get_db)):
+    """Erstellt ein neues Turnier mit automatischen Paarungen."""
+    players, active = _load_players_for_tournament(db)
+    result = _insert_tournament(db, tournament, players, active)
+    bump_tournament(db, result["id"])
     db.commit()
-    db.refresh(new_tournament)
+    return result
+
+
+@router.post("/tournaments/bulk", response_model=List[TournamentResponse])
+def create_tournaments_bulk(season: TournamentBulkCreate, db: Session = Depends(get_db)):
+    """Erstellt mehrere Turniere (z.B. eine ganze Saison) in einer Transaktion."""
+    if not season.tournaments:
+        raise HTTPException(status_code=400, detail="Keine Turniere angegeben.")
     
-    # Lade Paarungen mit Spielernamen
-    pairings_with_names = []
-    for pairing in created_pairings:
-        db.refresh(pairing)
-        pairings_with_names.append({
+    players, active = _load_players_for_tournament(db)
+    results = [_insert_tournament(db, tournament, players, active) for tournament in season.tournaments]
+    bump_versions(db, GLOBAL_SCOPE, *(tournament_scope(result["id"]) for result in results))
+    db.commit()
+    return results
+
+
+TOURNAMENT_FIELDS = ("id", "name", "year", "month", "pairings")
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Prüft eine ``fields=``-Projektion; ``id`` ist immer enthalten."""
+    if fields is None:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in TOURNAMENT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unbekannte Felder: {', '.join(unknown)}. Erlaubt: {', '.join(TOURNAMENT_FIELDS)}"
+        )
+    return [field for field in TOURNAMENT_FIELDS if field == "id" or field in requested]
+
+
+def _parse_tournament_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        year, month = (int(part) for part in cursor.split("-"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungültiger Cursor.")
+    return year, month
+
+
+def load_pairings(db: Session, tournament_ids: List[int]) -> Dict[int, List[dict]]:
+    """Lädt die Paarungen mehrerer Turniere inkl. Spielernamen in einer Query."""
+    pairings = (
+        db.query(Pairing)
+        .options(joinedload(Pairing.player1), joinedload(Pairing.player2))
+        .filter(Pairing.tournament_id.in_(tournament_ids))
+        .order_by(Pairing.id)
+        .all()
+    ) if tournament_ids else []
+    by_tournament: Dict[int, List[dict]] = {tournament_id: [] for tournament_id in tournament_ids}
+    for pairing in pairings:
+        by_tournament[pairing.tournament_id].append({
             "id": pairing.id,
             "player1_id": pairing.player1_id,
             "player1_name": pairing.player1.name,
             "player2_id": pairing.player2_id,
             "player2_name": pairing.player2.name
         })
-    
+    return by_tournament
+
+
+def tournament_to_response(tournament: Tournament, pairings: List[dict]) -> dict:
     return {
-        "id": new_tournament.id,
-        "name": new_tournament.name,
-        "year": new_tournament.year,
-        "month": new_tournament.month,
-        "pairings": pairings_with_names
+        "id": tournament.id,
+        "name": tournament.name,
+        "year": tournament.year,
+        "month": tournament.month,
+        "pairings": pairings
     }
 
 
-@router.get("/tournaments", response_model=List[TournamentResponse])
-def list_tournaments(db: Session = Depends(get_db)):
-    """Listet alle Turniere auf."""
-    tournaments = db.query(Tournament).order_by(Tournament.year.desc(), Tournament.month.desc()).all()
+@router.get("/tournaments", response_model=Union[List[TournamentResponse], TournamentPage])
+def list_tournaments(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Listet Turniere auf (neueste zuerst). Mit ``limit`` seitenweise als
+    ``{"items", "next_cursor"}``; ``next_cursor`` ist der ``cursor`` der nächsten Seite.
+    ``fields`` schränkt die Felder ein, z.B. ``fields=name,year,month`` ohne Paarungen.
+    """
+    selected = _parse_fields(fields)
+    after = _parse_tournament_cursor(cursor) if cursor else None
+    response_type = List[TournamentResponse] if selected is None else List[Dict[str, Any]]
+    return versioned_json_response(
+        request, db, GLOBAL_SCOPE, response_type,
+        lambda: _list_tournaments(db, limit, after, selected)
+    )
+
+
+def _list_tournaments(
+    db: Session,
+    limit: Optional[int],
+    after: Optional[Tuple[int, int]],
+    selected: Optional[List[str]],
+) -> Union[List[dict], Page]:
+    query = db.query(Tournament)
+    if after is not None:
+        # Keyset auf (year, month) absteigend, nutzt uq_tournaments_year_month
+        year, month = after
+        query = query.filter(or_(
+            Tournament.year < year,
+            and_(Tournament.year == year, Tournament.month < month),
+        ))
+    query = query.order_by(Tournament.year.desc(), Tournament.month.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
+    tournaments = query.all()
+
+    next_cursor = None
+    if limit is not None and len(tournaments) > limit:
+        tournaments = tournaments[:limit]
+        next_cursor = f"{tournaments[-1].year}-{tournaments[-1].month}"
+
+    if selected is None or "pairings" in selected:
+        pairings = load_pairings(db, [t.id for t in tournaments])
+    else:
+        pairings = {}
     result = []
     for tournament in tournaments:
-        pairings = db.query(Pairing).filter(Pairing.tournament_id == tournament.id).all()
-        pairings_with_names = []
-        for pairing in pairings:
-            db.refresh(pairing)
-            pairings_with_names.append({
-                "id": pairing.id,
-                "player1_id": pairing.player1_id,
-                "player1_name": pairing.player1.name,
-                "player2_id": pairing.player2_id,
-                "player2_name": pairing.player2.name
-            })
-        result.append({
-            "id": tournament.id,
-            "name": tournament.name,
-            "year": tournament.year,
-            "month": tournament.month,
-            "pairings": pairings_with_names
-        })
-    return result
+        item = tournament_to_response(tournament, pairings.get(tournament.id, []))
+        if selected is not None:
+            item = {field: item[field] for field in selected}
+        result.append(item)
+    return result if limit is None else Page(result, next_cursor)
 
 
 @router.get("/tournaments/{tournament_id}", response_model=TournamentResponse)
@@ -199,25 +347,7 @@ def get_tournament(tournament_id: int, db: Session = Depends(get_db)):
     if not tournament:
         raise HTTPException(status_code=404, detail="Turnier nicht gefunden.")
     
-    pairings = db.query(Pairing).filter(Pairing.tournament_id == tournament_id).all()
-    pairings_with_names = []
-    for pairing in pairings:
-        db.refresh(pairing)
-        pairings_with_names.append({
-            "id": pairing.id,
-            "player1_id": pairing.player1_id,
-            "player1_name": pairing.player1.name,
-            "player2_id": pairing.player2_id,
-            "player2_name": pairing.player2.name
-        })
-    
-    return {
-        "id": tournament.id,
-        "name": tournament.name,
-        "year": tournament.year,
-        "month": tournament.month,
-        "pairings": pairings_with_names
-    }
+    return tournament_to_response(tournament, load_pairings(db, [tournament_id])[tournament_id])
 
 
 @router.delete("/tournaments/{tournament_id}")
@@ -227,12 +357,17 @@ def delete_tournament(tournament_id: int, db: Session = Depends(get_db)):
     if not tournament:
         raise HTTPException(status_code=404, detail="Turnier nicht gefunden.")
 
+    record_changes(db, TOURNAMENT, [tournament_id], DELETE)
+    record_tournament_games(db, tournament_id, DELETE)
     # Spiele löschen
     db.query(Game).filter(Game.tournament_id == tournament_id).delete()
     # Paarungen löschen
     db.query(Pairing).filter(Pairing.tournament_id == tournament_id).delete()
+    # Punkte-Rollup löschen
+    delete_tournament_scores(db, tournament_id)
     # Turnier löschen
     db.delete(tournament)
+    bump_tournament(db, tournament_id)
     db.commit()
     return {"message": "Turnier gelöscht"}
 
@@ -0,0 +1,66 @@
+"""Admin-Kommandos für das Backend.
+
+Aufruf: ``python -m app.cli <kommando>``
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+from app import models  # noqa: F401 stellt sicher, dass Modelle registriert sind
+from app.db.database import Base, SessionLocal, engine
+from app.db.migrations import run_migrations
+from app.services.player_scores import rebuild_player_scores
+
+
+def rebuild_rollup(args: argparse.Namespace) -> int:
+    """Baut ``player_tournament_scores`` aus ``games`` neu auf und meldet Abweichungen."""
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        mismatches = rebuild_player_scores(db)
+        if args.dry_run:
+            db.rollback()
+        else:
+            db.commit()
+
+    for mismatch in mismatches:
+        print(
+            f"Spieler {mismatch['player_id']}, Turnier {mismatch['tournament_id']}: "
+            f"gespeichert={mismatch['stored']} erwartet={mismatch['expected']}"
+        )
+    print(f"{len(mismatches)} Abweichung(en) gefunden.")
+    if args.dry_run and mismatches:
+        return 1
+    return 0
+
+
+def migrate(args: argparse.Namespace) -> int:
+    """Legt fehlende Tabellen an und wendet ausstehende Migrationen an."""
+    Base.metadata.create_all(bind=engine)
+    applied = run_migrations(engine)
+    print(f"Angewendete Migrationen: {applied or 'keine'}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subparsers.add_parser(
+        "rebuild-rollup", help="Punkte-Rollup aus den Spielen neu berechnen"
+    )
+    rebuild.add_argument(
+        "--dry-run", action="store_true", help="nur prüfen, nichts schreiben"
+    )
+    rebuild.set_defaults(func=rebuild_rollup)
+
+    subparsers.add_parser(
+        "migrate", help="ausstehende Schema-Migrationen anwenden"
+    ).set_defaults(func=migrate)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
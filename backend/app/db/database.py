@@ -1,18 +1,141 @@
-from typing import Generator
+import os
+import threading
+from typing import Dict, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 
-DATABASE_URL = "sqlite:///./app.db"
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./app.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
+# Pool-Einstellungen (gelten für SQLite-Dateien und PostgreSQL)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+
+# SQLite-Pragmas
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+
+class PoolStats:
+    """Zählt Checkouts des Connection-Pools, um die Pool-Größe passend zu wählen."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "connects_total": self.connects,
+                "checkouts_total": self.checkouts,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+            }
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:"
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Setzt pro neuer SQLite-Verbindung WAL und Performance-Pragmas."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        # Negativer Wert = Größe in KiB statt in Seiten
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    finally:
+        cursor.close()
+
+
+def build_engine(url: str = DATABASE_URL) -> Engine:
+    """Erzeugt die Engine passend zum Backend aus der Konfiguration."""
+    backend = make_url(url).get_backend_name()
+
+    if backend == "sqlite":
+        if _is_memory_sqlite(url):
+            # In-Memory-DB existiert nur in ihrer Verbindung: eine für alle Threads, damit
+            # Requests aus dem Threadpool das beim Import angelegte Schema sehen
+            return create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        new_engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            },
+            poolclass=QueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+        return new_engine
+
+    return create_engine(
+        url,
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+def attach_pool_stats(target: Engine) -> PoolStats:
+    stats = PoolStats()
+    event.listen(target, "connect", stats.on_connect)
+    event.listen(target, "checkout", stats.on_checkout)
+    event.listen(target, "checkin", stats.on_checkin)
+    return stats
+
+
+engine = build_engine()
+pool_stats = attach_pool_stats(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def get_pool_status() -> dict:
+    """Aktueller Zustand des Connection-Pools inkl. Checkout-Statistik."""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__, **pool_stats.snapshot()}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": DB_MAX_OVERFLOW,
+        })
+    return status
+
+
 def get_db() -> Generator:
     """FastAPI-Dependency, das eine Datenbank-Session bereitstellt."""
     db = SessionLocal()
@@ -20,8 +143,3 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
-
-
-
-
-
@@ -0,0 +1,138 @@
+"""Leichtgewichtiger, versionierter Migrationslauf für bestehende Datenbanken.
+
+``Base.metadata.create_all`` legt nur fehlende Tabellen an. Alles, was eine
+bestehende Datenbank (z.B. die produktive ``app.db``) nachträglich braucht –
+Indizes, Datenbefüllungen – steht hier als nummerierte Migration. Angewendete
+Versionen werden in ``schema_migrations`` vermerkt, jede Migration läuft in
+einer eigenen Transaktion.
+"""
+
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.services.changes import seed_change_log
+from app.services.message_search import ensure_message_search
+from app.services.player_scores import backfill_player_scores
+from app.services.versioning import ensure_instance_id
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Session], None]
+
+
+def _sql(*statements: str) -> Callable[[Session], None]:
+    def apply(db: Session) -> None:
+        for statement in statements:
+            db.execute(text(statement))
+    return apply
+
+
+def _add_columns(table: str, *columns: str) -> Callable[[Session], None]:
+    """Ergänzt fehlende Spalten (``"name TYP"``); bereits vorhandene werden übersprungen."""
+    def apply(db: Session) -> None:
+        existing = {column["name"] for column in inspect(db.connection()).get_columns(table)}
+        for column in columns:
+            if column.split()[0] not in existing:
+                db.execute(text(f"ALTER TABLE {table} ADD COLUMN {column}"))
+    return apply
+
+
+def _chain(*steps: Callable[[Session], None]) -> Callable[[Session], None]:
+    def apply(db: Session) -> None:
+        for step in steps:
+            step(db)
+    return apply
+
+
+class MigrationError(RuntimeError):
+    """Bestehende Daten verhindern eine Migration; muss von Hand bereinigt werden."""
+
+
+def _check_unique_tournament_months(db: Session) -> None:
+    """Bricht mit den betroffenen IDs ab, statt beim Unique-Index an einem IntegrityError zu scheitern."""
+    duplicates: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for tournament_id, year, month in db.execute(
+        text("SELECT id, year, month FROM tournaments ORDER BY year, month, id")
+    ):
+        duplicates[(year, month)].append(tournament_id)
+    conflicts = [
+        f"{month}/{year}: IDs {', '.join(map(str, ids))}"
+        for (year, month), ids in duplicates.items()
+        if len(ids) > 1
+    ]
+    if conflicts:
+        raise MigrationError(
+            "Mehrere Turniere im selben Monat, Unique-Index uq_tournaments_year_month nicht möglich. "
+            "Bitte überzählige Turniere löschen oder umdatieren: " + "; ".join(conflicts)
+        )
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "player_scores_backfill", backfill_player_scores),
+    Migration(2, "hot_path_indexes", _chain(
+        _check_unique_tournament_months,
+        _sql(
+            "CREATE INDEX IF NOT EXISTS ix_games_tournament_winner ON games (tournament_id, winner_pairing_id)",
+            "CREATE INDEX IF NOT EXISTS ix_games_pairing1 ON games (pairing1_id)",
+            "CREATE INDEX IF NOT EXISTS ix_games_pairing2 ON games (pairing2_id)",
+            "CREATE INDEX IF NOT EXISTS ix_pairings_tournament_player1 ON pairings (tournament_id, player1_id)",
+            "CREATE INDEX IF NOT EXISTS ix_pairings_tournament_player2 ON pairings (tournament_id, player2_id)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_tournaments_year_month ON tournaments (year, month)",
+        ),
+    )),
+    Migration(3, "message_prompt_key", _chain(
+        _add_columns("messages", "model VARCHAR(100)", "prompt_key VARCHAR(64)"),
+        _sql("CREATE INDEX IF NOT EXISTS ix_messages_prompt_key ON messages (prompt_key)"),
+    )),
+    Migration(4, "message_fulltext_search", ensure_message_search),
+    Migration(5, "player_active_flag", _add_columns("players", "active BOOLEAN NOT NULL DEFAULT TRUE")),
+    Migration(6, "change_log_seed", seed_change_log),
+    Migration(7, "data_version_instance", ensure_instance_id),
+]
+
+
+def applied_versions(engine: Engine) -> List[int]:
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, "
+            "name VARCHAR(100) NOT NULL, "
+            "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        rows = conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))
+        return [row[0] for row in rows]
+
+
+def run_migrations(engine: Engine, migrations: Optional[List[Migration]] = None) -> List[int]:
+    """Wendet alle noch fehlenden Migrationen an und liefert deren Versionen."""
+    migrations = MIGRATIONS if migrations is None else migrations
+    done = set(applied_versions(engine))
+    applied: List[int] = []
+
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        with Session(bind=engine) as db:
+            # Version zuerst beanspruchen: ein parallel startender Worker wartet hier auf
+            # unseren Commit und überspringt die Migration dann, statt sie erneut anzuwenden
+            claimed = db.execute(
+                text(
+                    "INSERT INTO schema_migrations (version, name) VALUES (:version, :name) "
+                    "ON CONFLICT (version) DO NOTHING"
+                ),
+                {"version": migration.version, "name": migration.name},
+            ).rowcount
+            if not claimed:
+                db.rollback()
+                continue
+            migration.apply(db)
+            db.commit()
+        applied.append(migration.version)
+
+    return applied
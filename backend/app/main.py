@@ -1,16 +1,55 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from app import models  # noqa: F401 stellt sicher, dass Modelle registriert sind
+from app.api.ai import close_ollama_client, get_ollama_client, message_writer, ollama_gate
+from app.api.admin import router as admin_router
+from app.api.ai import router as ai_router
+from app.api.changes import router as changes_router
 from app.api.players import router as players_router
 from app.api.tournaments import router as tournaments_router
+from app.api.games import game_writer, refresh_live_scoreboards
 from app.api.games import router as games_router
 from app.api.statistics import router as statistics_router
-from app.db.database import Base, engine
+from app.db.database import Base, engine, get_pool_status
+from app.db.migrations import run_migrations
+from app.services.http_cache import evict_scopes
+from app.services.invalidation import InvalidationBus
+from app.services.live_scores import scoreboard_hub
+from app.services.metrics import MetricsMiddleware, instrument_engine, metrics_registry
+from app.services.profiling import ProfilingMiddleware, profiling_enabled
+from app.services.prompt_cache import prompt_cache
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+instrument_engine(engine)
+
+# Hält In-Process-Caches und Live-Kanäle mit Schreibzugriffen anderer Worker synchron
+invalidation_bus = InvalidationBus(engine)
+invalidation_bus.subscribe(evict_scopes)
+invalidation_bus.subscribe(refresh_live_scoreboards)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Hält Ollama-Client, Writer-Threads und Invalidierungs-Bus über die Lebensdauer der App."""
+    get_ollama_client()
+    message_writer.start()
+    await run_in_threadpool(invalidation_bus.start)
+    try:
+        yield
+    finally:
+        await run_in_threadpool(invalidation_bus.stop)
+        await close_ollama_client()
+        # Ausstehende Chat-Nachrichten und Spielergebnisse vor dem Beenden schreiben
+        await run_in_threadpool(message_writer.stop)
+        await run_in_threadpool(game_writer.stop)
 
-app = FastAPI(title="Kartenspiel-Turnierverwaltung API")
+
+app = FastAPI(title="Kartenspiel-Turnierverwaltung API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,15 +57,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(MetricsMiddleware)
+if profiling_enabled():
+    # Nur eingehängt, wenn konfiguriert: sonst kein Overhead pro Request
+    app.add_middleware(ProfilingMiddleware)
 
 app.include_router(players_router, prefix="/api")
 app.include_router(tournaments_router, prefix="/api")
 app.include_router(games_router, prefix="/api")
 app.include_router(statistics_router, prefix="/api")
+app.include_router(ai_router, prefix="/api")
+app.include_router(changes_router, prefix="/api")
+app.include_router(admin_router, prefix="/api")
 
 
 @app.get("/health")
 def healthcheck() -> dict:
     return {"status": "ok"}
 
+
+@app.get("/health/db")
+def database_health() -> dict:
+    """Pool-Auslastung und Checkout-Statistik der Datenbank-Engine."""
+    return {"backend": engine.dialect.name, "pool": get_pool_status()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Prometheus-Endpunkt: Request-/SQL-Histogramme pro Route, Pool- und Ollama-Statistik."""
+    body = metrics_registry.render({
+        "db_pool": get_pool_status(),
+        "ollama": ollama_gate.stats(),
+        "ai_prompt_cache": prompt_cache.stats(),
+        "ai_message_writer": message_writer.stats(),
+        "game_writer": game_writer.stats(),
+        "live_scores": scoreboard_hub.stats(),
+        "cache_invalidation": invalidation_bus.stats(),
+    })
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
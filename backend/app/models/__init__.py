@@ -4,3 +4,7 @@ from app.models.player import Player  # noqa: F401
 from app.models.tournament import Tournament  # noqa: F401
 from app.models.pairing import Pairing  # noqa: F401
 from app.models.game import Game  # noqa: F401
+from app.models.message import Message  # noqa: F401
+from app.models.player_score import PlayerTournamentScore  # noqa: F401
+from app.models.data_version import DataVersion  # noqa: F401
+from app.models.change_log import ChangeLogEntry  # noqa: F401
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, DateTime, Integer, String, func
+
+from app.db.database import Base
+
+
+class ChangeLogEntry(Base):
+    """Append-only Änderungsprotokoll; ``seq`` steigt monoton und dient Clients als Sync-Marke."""
+
+    __tablename__ = "change_log"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(20), nullable=False)  # "player", "tournament" oder "game"
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)  # "upsert" oder "delete"
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String
+
+from app.db.database import Base
+
+
+class DataVersion(Base):
+    """Versionszähler je Datenbereich ("global" oder "tournament:<id>"), erhöht bei jedem Schreibzugriff."""
+
+    __tablename__ = "data_versions"
+
+    scope = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer
+from sqlalchemy import Column, ForeignKey, Index, Integer
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
@@ -20,6 +20,12 @@ class Game(Base):
     pairing2 = relationship("Pairing", foreign_keys=[pairing2_id], back_populates="games_as_pairing2")
     winner_pairing = relationship("Pairing", foreign_keys=[winner_pairing_id])
 
+    __table_args__ = (
+        Index("ix_games_tournament_winner", "tournament_id", "winner_pairing_id"),
+        Index("ix_games_pairing1", "pairing1_id"),
+        Index("ix_games_pairing2", "pairing2_id"),
+    )
+
 
 
 
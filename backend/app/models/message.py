@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, Text, func
+from sqlalchemy import Column, DateTime, Integer, String, Text, func
 
 from app.db.database import Base
 
@@ -10,6 +10,8 @@ class Message(Base):
     content = Column(Text, nullable=False)
     response = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    model = Column(String(100), nullable=True)
+    prompt_key = Column(String(64), nullable=True, index=True)  # Hash aus Modell + normalisiertem Prompt
 
 
 
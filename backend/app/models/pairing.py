@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer
+from sqlalchemy import Column, ForeignKey, Index, Integer
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
@@ -20,3 +20,8 @@ class Pairing(Base):
     games_as_pairing1 = relationship("Game", foreign_keys=[Game.pairing1_id], back_populates="pairing1")
     games_as_pairing2 = relationship("Game", foreign_keys=[Game.pairing2_id], back_populates="pairing2")
 
+    __table_args__ = (
+        Index("ix_pairings_tournament_player1", "tournament_id", "player1_id"),
+        Index("ix_pairings_tournament_player2", "tournament_id", "player2_id"),
+    )
+
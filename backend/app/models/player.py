@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String, func
+from sqlalchemy import Boolean, Column, DateTime, Integer, String, func, true
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
@@ -10,6 +10,8 @@ class Player(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False, unique=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Nur aktive Spieler werden ohne explizite Teilnehmerliste eingeplant
+    active = Column(Boolean, nullable=False, default=True, server_default=true())
 
     # Relationships
     pairings_as_player1 = relationship("Pairing", foreign_keys="Pairing.player1_id", back_populates="player1")
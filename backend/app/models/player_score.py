@@ -0,0 +1,20 @@
+from sqlalchemy import Column, ForeignKey, Index, Integer
+
+from app.db.database import Base
+
+
+class PlayerTournamentScore(Base):
+    """Vorberechnete Punkte eines Spielers pro Turnier (wird beim Schreiben gepflegt)."""
+
+    __tablename__ = "player_tournament_scores"
+
+    player_id = Column(Integer, ForeignKey("players.id"), primary_key=True)
+    tournament_id = Column(Integer, ForeignKey("tournaments.id"), primary_key=True)
+    year = Column(Integer, nullable=False)  # denormalisiert für die Jahresübersicht
+    partner_id = Column(Integer, ForeignKey("players.id"), nullable=True)
+    points = Column(Integer, nullable=False, default=0)
+    games_played = Column(Integer, nullable=False, default=0)  # Spiele mit eingetragenem Ergebnis
+
+    __table_args__ = (
+        Index("ix_player_tournament_scores_year_player", "year", "player_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Integer, String, func
+from sqlalchemy import Column, DateTime, Index, Integer, String, func
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
@@ -16,6 +16,11 @@ class Tournament(Base):
     # Relationships
     pairings = relationship("Pairing", back_populates="tournament", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Ein Turnier pro Monat; dient zugleich als Index für Filter auf year/month
+        Index("uq_tournaments_year_month", "year", "month", unique=True),
+    )
+
 
 
 
@@ -0,0 +1 @@
+# Service module
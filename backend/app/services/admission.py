@@ -0,0 +1,157 @@
+"""Begrenzte Warteschlange mit Request-Coalescing vor einem langsamen Upstream (Ollama)."""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Hashable
+
+
+class QueueFullError(Exception):
+    """Die Warteschlange ist voll; der Aufrufer soll es nach ``retry_after`` Sekunden erneut versuchen."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Warteschlange voll")
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """
+    Lässt höchstens ``max_in_flight`` Aufrufe gleichzeitig zum Upstream durch, hält bis zu
+    ``max_queue`` weitere in einer FIFO-Warteschlange und lehnt darüber hinaus sofort ab.
+    Identische, gleichzeitig laufende Aufrufe (gleicher Schlüssel) teilen sich ein Ergebnis.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, retry_after: int) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+        self.requests = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.upstream_seconds_total = 0.0
+        self.upstream_seconds_max = 0.0
+
+    def is_full(self) -> bool:
+        return self._in_flight >= self.max_in_flight and len(self._waiters) >= self.max_queue
+
+    async def _acquire(self) -> None:
+        start = time.perf_counter()
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+        else:
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError(self.retry_after)
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                # _release übergibt den Slot direkt an den Wartenden
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    self._release()
+                raise
+        waited = time.perf_counter() - start
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Belegt einen Upstream-Slot und misst die Upstream-Dauer."""
+        self.requests += 1
+        await self._acquire()
+        start = time.perf_counter()
+        self.upstream_calls += 1
+        try:
+            yield
+        except Exception:
+            self.upstream_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.upstream_seconds_total += elapsed
+            self.upstream_seconds_max = max(self.upstream_seconds_max, elapsed)
+            self._release()
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Führt ``call`` über einen Slot aus; läuft derselbe Schlüssel bereits, wird dessen
+        Ergebnis geteilt. Bricht der führende Aufruf ab (z.B. Client getrennt), übernimmt
+        ein Mitwartender mit seinem eigenen ``call``, statt den Abbruch zu erben.
+        """
+        coalesced = False
+        while True:
+            pending = self._calls.get(key)
+            if pending is None:
+                if coalesced:
+                    # Wird selbst führend und in slot() erneut gezählt
+                    self.requests -= 1
+                    self.coalesced -= 1
+                return await self._lead(key, call)
+            if not coalesced:
+                self.requests += 1
+                self.coalesced += 1
+                coalesced = True
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if pending.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+    async def _lead(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            async with self.slot():
+                result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Als abgerufen markieren, falls niemand mitgewartet hat
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "upstream_seconds_total": round(self.upstream_seconds_total, 6),
+            "upstream_seconds_max": round(self.upstream_seconds_max, 6),
+        }
@@ -0,0 +1,117 @@
+"""Änderungsprotokoll für Delta-Sync (``GET /api/changes?since=N``).
+
+Jeder Schreibpfad trägt in derselben Transaktion ein, welche Zeilen sich geändert
+haben. Gelesen wird ab einer Sequenznummer; mehrere Einträge derselben Entität
+werden zum letzten Stand zusammengefasst, so dass Aufwand und Antwortgröße nur
+von der Zahl der Änderungen abhängen.
+
+Eine Sequenznummer wird beim INSERT vergeben, sichtbar wird sie erst mit dem
+Commit. Damit ein Client nie eine kleinere, noch unsichtbare Nummer überspringt,
+werden Einträge bei PostgreSQL per Advisory-Lock bis zum Commit serialisiert;
+SQLite kennt ohnehin nur einen Schreiber zur Zeit.
+"""
+
+import os
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from sqlalchemy import exists, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from app.models.change_log import ChangeLogEntry
+from app.models.game import Game
+from app.models.player import Player
+from app.models.tournament import Tournament
+
+CHANGES_PAGE_SIZE = int(os.environ.get("CHANGES_PAGE_SIZE", "1000"))
+
+PLAYER = "player"
+TOURNAMENT = "tournament"
+GAME = "game"
+ENTITIES = (PLAYER, TOURNAMENT, GAME)
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+# Schlüssel des transaktionsweiten Advisory-Locks (PostgreSQL) für Protokolleinträge
+CHANGE_LOG_LOCK_KEY = 7_402_201
+
+
+def _serialize_appends(db: Session) -> None:
+    """Hält bis zum Commit alle anderen Schreiber des Protokolls an (reentrant je Transaktion)."""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGE_LOG_LOCK_KEY})
+
+
+def record_changes(db: Session, entity: str, entity_ids: Iterable[int], op: str = UPSERT) -> None:
+    """Protokolliert Änderungen an ``entity`` (ohne Commit) mit einem Statement."""
+    rows = [{"entity": entity, "entity_id": entity_id, "op": op} for entity_id in entity_ids]
+    if rows:
+        _serialize_appends(db)
+        db.execute(insert(ChangeLogEntry), rows)
+
+
+def record_tournament_games(db: Session, tournament_id: int, op: str = UPSERT) -> None:
+    """Protokolliert alle Spiele eines Turniers per INSERT … SELECT, ohne die IDs zu laden."""
+    _serialize_appends(db)
+    db.execute(
+        insert(ChangeLogEntry).from_select(
+            ["entity", "entity_id", "op"],
+            select(literal(GAME), Game.id, literal(op)).where(Game.tournament_id == tournament_id),
+        )
+    )
+
+
+def seed_change_log(db: Session) -> None:
+    """
+    Trägt alle vorhandenen Spieler, Turniere und Spiele, die noch nicht im Protokoll
+    stehen, als ``upsert`` ein. So liefert ``since=0`` auch auf einer migrierten
+    Datenbank den vollständigen Bestand.
+    """
+    _serialize_appends(db)
+    for entity, model in ((PLAYER, Player), (TOURNAMENT, Tournament), (GAME, Game)):
+        logged = exists().where(ChangeLogEntry.entity == entity, ChangeLogEntry.entity_id == model.id)
+        db.execute(
+            insert(ChangeLogEntry).from_select(
+                ["entity", "entity_id", "op"],
+                select(literal(entity), model.id, literal(UPSERT)).where(~logged).order_by(model.id),
+            )
+        )
+
+
+def latest_seq(db: Session) -> int:
+    return db.query(func.coalesce(func.max(ChangeLogEntry.seq), 0)).scalar()
+
+
+class ChangeSet(NamedTuple):
+    upserted: Dict[str, List[int]]
+    deleted: Dict[str, List[int]]
+    next_seq: int
+    has_more: bool
+
+
+def changes_since(db: Session, since: int, limit: int = CHANGES_PAGE_SIZE) -> ChangeSet:
+    """
+    Liest bis zu ``limit`` Protokolleinträge nach ``since`` und fasst sie pro Entität
+    zusammen: maßgeblich ist jeweils die letzte Operation.
+    """
+    rows = (
+        db.query(ChangeLogEntry.seq, ChangeLogEntry.entity, ChangeLogEntry.entity_id, ChangeLogEntry.op)
+        .filter(ChangeLogEntry.seq > since)
+        .order_by(ChangeLogEntry.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    last_op: Dict[Tuple[str, int], str] = {}
+    for _, entity, entity_id, op in rows:
+        last_op.pop((entity, entity_id), None)  # Reihenfolge nach letzter Änderung
+        last_op[(entity, entity_id)] = op
+
+    upserted: Dict[str, List[int]] = {entity: [] for entity in ENTITIES}
+    deleted: Dict[str, List[int]] = {entity: [] for entity in ENTITIES}
+    for (entity, entity_id), op in last_op.items():
+        (deleted if op == DELETE else upserted)[entity].append(entity_id)
+
+    return ChangeSet(upserted, deleted, rows[-1].seq if rows else since, has_more)
@@ -0,0 +1,204 @@
+"""Optionaler Single-Writer für Spielergebnisse (Group Commit).
+
+Mit ``GAME_WRITE_QUEUE=true`` schreibt ``PATCH /api/games/{id}`` nicht mehr selbst,
+sondern reiht das Ergebnis hier ein und wartet auf sein Future. Ein einziger Thread
+sammelt gleichzeitig eintreffende Ergebnisse und schreibt sie in einer Transaktion
+(ein Commit, ein fsync). Da nur dieser Thread Ergebnisse schreibt, konkurrieren die
+Requests eines Workers nicht mehr um die SQLite-Schreibsperre. Das Future wird erst
+nach dem Commit erfüllt; ein anschließender Lesezugriff des Aufrufers sieht also
+sein eigenes Ergebnis.
+
+Auch die Sammel-Eintragung eines Turniers läuft dann über diesen Thread, als ein
+Auftrag: entweder werden alle seine Ergebnisse geschrieben oder keines.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.game import Game
+from app.services.changes import GAME, record_changes
+from app.services.player_scores import record_game_results
+from app.services.versioning import GLOBAL_SCOPE, bump_versions, tournament_scope
+
+logger = logging.getLogger(__name__)
+
+GAME_WRITE_QUEUE = os.environ.get("GAME_WRITE_QUEUE", "false").lower() in ("1", "true", "yes")
+GAME_WRITE_BATCH_SIZE = int(os.environ.get("GAME_WRITE_BATCH_SIZE", "200"))
+GAME_WRITE_WINDOW = float(os.environ.get("GAME_WRITE_WINDOW", "0.002"))
+
+_STOP = object()
+
+
+class GameNotFound(LookupError):
+    pass
+
+
+class InvalidWinner(ValueError):
+    pass
+
+
+class GameResult(NamedTuple):
+    game_id: int
+    winner_pairing_id: Optional[int]
+
+
+class _Job(NamedTuple):
+    results: Tuple[GameResult, ...]
+    # Nur für Sammel-Eintragungen: alle Spiele müssen zu diesem Turnier gehören
+    tournament_id: Optional[int]
+    future: Future
+
+
+class GameResultWriter:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int = GAME_WRITE_BATCH_SIZE,
+        window: float = GAME_WRITE_WINDOW,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.window = window
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.rejected = 0
+        self.batches = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="game-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, game_id: int, winner_pairing_id: Optional[int]) -> Future:
+        """
+        Reiht ein Ergebnis ein; das Future liefert nach dem Commit die Turnier-ID des
+        Spiels oder wirft ``GameNotFound``/``InvalidWinner``.
+        """
+        return self.submit_many([GameResult(game_id, winner_pairing_id)])
+
+    def submit_many(self, results: Sequence[GameResult], tournament_id: Optional[int] = None) -> Future:
+        """Wie ``submit`` für mehrere Ergebnisse, die nur gemeinsam geschrieben werden."""
+        self.start()
+        future: Future = Future()
+        self._queue.put(_Job(tuple(results), tournament_id, future))
+        return future
+
+    def stop(self) -> None:
+        """Schreibt ausstehende Ergebnisse und beendet den Thread (beim Shutdown)."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                return
+            batch: List[_Job] = [job]
+            stop = False
+            # Kurz nachsammeln: was in diesem Fenster eintrifft, teilt sich den Commit
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    job = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    stop = True
+                    break
+                batch.append(job)
+
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[_Job]) -> None:
+        try:
+            with self.session_factory() as db:
+                outcomes = apply_results(db, [(job.results, job.tournament_id) for job in batch])
+                db.commit()
+        except Exception as exc:
+            self.errors += 1
+            logger.exception("Schreiben von %d Spielergebnissen fehlgeschlagen", len(batch))
+            for job in batch:
+                job.future.set_exception(exc)
+            return
+
+        self.batches += 1
+        for job, outcome in zip(batch, outcomes):
+            if isinstance(outcome, Exception):
+                self.rejected += 1
+                job.future.set_exception(outcome)
+            else:
+                self.written += len(job.results)
+                job.future.set_result(outcome)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+
+def _validate(
+    games: Dict[int, Game], results: Sequence[GameResult], tournament_id: Optional[int]
+) -> Optional[Exception]:
+    for result in results:
+        game = games.get(result.game_id)
+        if game is None or (tournament_id is not None and game.tournament_id != tournament_id):
+            if tournament_id is None:
+                return GameNotFound("Spiel nicht gefunden.")
+            return GameNotFound(f"Spiel {result.game_id} gehört nicht zu diesem Turnier.")
+        if result.winner_pairing_id is not None and result.winner_pairing_id not in (game.pairing1_id, game.pairing2_id):
+            return InvalidWinner("Die Gewinner-Paarung muss eine der beiden Spiel-Paarungen sein.")
+    return None
+
+
+def apply_results(
+    db: Session, jobs: Sequence[Tuple[Sequence[GameResult], Optional[int]]]
+) -> List[object]:
+    """
+    Wendet die Aufträge ``(Ergebnisse, Turnier-ID)`` in Eingangsreihenfolge an (ohne
+    Commit). Liefert pro Auftrag die Turnier-ID oder die Exception, mit der nur dieser
+    Auftrag (vollständig) abgelehnt wird.
+    """
+    game_ids = {result.game_id for results, _ in jobs for result in results}
+    games = {game.id: game for game in db.query(Game).filter(Game.id.in_(game_ids))}
+    # Bisheriger Gewinner vor dem Batch; mehrfach geänderte Spiele zählen im Rollup einmal
+    previous: Dict[int, Optional[int]] = {}
+    outcomes: List[object] = []
+    for results, tournament_id in jobs:
+        error = _validate(games, results, tournament_id)
+        if error is not None:
+            outcomes.append(error)
+            continue
+        for result in results:
+            game = games[result.game_id]
+            previous.setdefault(game.id, game.winner_pairing_id)
+            game.winner_pairing_id = result.winner_pairing_id
+        outcomes.append(tournament_id if tournament_id is not None else games[results[0].game_id].tournament_id)
+
+    if previous:
+        record_game_results(db, [(games[game_id], winner_id) for game_id, winner_id in previous.items()])
+        record_changes(db, GAME, list(previous))
+        tournament_ids = sorted({games[game_id].tournament_id for game_id in previous})
+        bump_versions(db, GLOBAL_SCOPE, *(tournament_scope(tid) for tid in tournament_ids))
+    return outcomes
@@ -0,0 +1,80 @@
+"""ETag-basierte Conditional GETs mit serverseitigem LRU für serialisierte Antworten."""
+
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from app.services.cache import LRUCache
+from app.services.versioning import INSTANCE_SCOPE, get_versions
+
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "256"))
+
+response_cache = LRUCache(RESPONSE_CACHE_SIZE)
+
+
+class Page(NamedTuple):
+    """Eine Seite einer Keyset-Paginierung; ausgeliefert als ``{"items": [...], "next_cursor": ...}``."""
+
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Kein "*": bei GET hieße das "existiert", das prüft erst build()
+    return etag in (value.strip() for value in header.split(","))
+
+
+def versioned_json_response(
+    request: Request,
+    db: Session,
+    scope: str,
+    response_type: Any,
+    build: Callable[[], Any],
+) -> Response:
+    """
+    Liefert eine JSON-Antwort mit starkem ETag aus Datenbank-Instanz und Version von ``scope``.
+
+    Passt ``If-None-Match``, wird sofort 304 geliefert; sonst kommt der Body aus dem
+    LRU (Schlüssel: Bereich, Pfad, Query, Version) oder wird über ``build`` erzeugt und mit
+    ``response_type`` serialisiert. Liefert ``build`` eine ``Page``, beschreibt
+    ``response_type`` deren Liste; der Body ist dann ``{"items", "next_cursor"}``.
+    Ohne Versionszeile (z.B. unbekanntes Turnier) gibt es kein 304: ``build`` entscheidet,
+    ob die Ressource existiert.
+    """
+    versions = get_versions(db, [scope, INSTANCE_SCOPE])
+    version, instance = versions[scope], versions[INSTANCE_SCOPE]
+    etag = f'"{scope}-{instance:x}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if version and _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (scope, request.url.path, str(request.query_params), instance, version)
+    cached = response_cache.get(key)
+    if cached is None:
+        data = build()
+        if isinstance(data, Page):
+            items = _adapter(response_type).validate_python(data.items)
+            cached = _adapter(Dict[str, Any]).dump_json({"items": items, "next_cursor": data.next_cursor})
+        else:
+            adapter = _adapter(response_type)
+            cached = adapter.dump_json(adapter.validate_python(data))
+        response_cache.put(key, cached)
+
+    return Response(content=cached, media_type="application/json", headers=headers)
+
+
+def evict_scopes(db: Session, scopes: Set[str]) -> None:
+    """Listener für den Invalidierungs-Bus: verwirft gecachte Antworten geänderter Bereiche."""
+    response_cache.evict(lambda key: key[0] in scopes)
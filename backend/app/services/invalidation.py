@@ -0,0 +1,134 @@
+"""Cache-Invalidierung über Worker-Grenzen ohne externen Dienst.
+
+Jeder Schreibpfad erhöht in ``data_versions`` die betroffenen Bereiche, immer
+auch ``global``. Ein Hintergrund-Thread pro Worker fragt alle
+``CACHE_POLL_INTERVAL`` Sekunden ab, ob sich etwas geändert hat. Bei SQLite
+genügt dafür ``PRAGMA data_version`` auf der eigenen Verbindung, sonst die
+globale Version. Nur dann lädt er die Versionstabelle und meldet die geänderten
+Bereiche an die registrierten Callbacks. Jeder Worker verwirft betroffene
+Einträge so spätestens nach einem Poll-Intervall.
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.services.versioning import GLOBAL_SCOPE
+
+CACHE_POLL_INTERVAL = float(os.environ.get("CACHE_POLL_INTERVAL", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[Session, Set[str]], None]
+
+
+class InvalidationBus:
+    def __init__(self, engine: Engine, interval: float = CACHE_POLL_INTERVAL) -> None:
+        self.engine = engine
+        self.interval = interval
+        self._listeners: List[Listener] = []
+        self._versions: Optional[Dict[str, int]] = None
+        self._data_version: Optional[int] = None
+        self._connection: Optional[Connection] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.polls = 0
+        self.reloads = 0
+        self.invalidated_scopes = 0
+        self.errors = 0
+
+    def subscribe(self, listener: Listener) -> None:
+        """``listener(session, scopes)`` wird mit jeder Menge geänderter Bereiche aufgerufen."""
+        self._listeners.append(listener)
+
+    def _changed(self, connection: Connection) -> bool:
+        """Günstige Vorprüfung, ob seit dem letzten Poll jemand geschrieben hat."""
+        if self.engine.dialect.name == "sqlite":
+            # Ändert sich nur durch Commits anderer Verbindungen; kostet keinen Tabellenzugriff
+            current = connection.exec_driver_sql("PRAGMA data_version").scalar()
+        else:
+            current = connection.execute(
+                text("SELECT version FROM data_versions WHERE scope = :scope"), {"scope": GLOBAL_SCOPE}
+            ).scalar()
+        changed = current != self._data_version
+        self._data_version = current
+        return changed
+
+    def poll(self) -> Set[str]:
+        """Ein Abgleich; liefert die geänderten Bereiche (beim ersten Aufruf nur die Ausgangslage)."""
+        with self._lock:
+            if self._connection is None:
+                self._connection = self.engine.connect()
+            connection = self._connection
+            try:
+                self.polls += 1
+                if not self._changed(connection) and self._versions is not None:
+                    return set()
+                versions = dict(connection.execute(text("SELECT scope, version FROM data_versions")).all())
+                self.reloads += 1
+            finally:
+                # Transaktion beenden, damit der nächste Poll einen frischen Stand sieht
+                connection.rollback()
+
+            previous, self._versions = self._versions, versions
+            if previous is None:
+                return set()
+            changed = {
+                scope for scope, version in versions.items() if previous.get(scope) != version
+            } | (previous.keys() - versions.keys())
+            self.invalidated_scopes += len(changed)
+
+        if changed:
+            with Session(self.engine) as session:
+                for listener in self._listeners:
+                    try:
+                        listener(session, changed)
+                    except Exception:  # ein fehlerhafter Listener darf den Bus nicht stoppen
+                        self.errors += 1
+                        logger.exception("Cache-Invalidierung fehlgeschlagen")
+        return changed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                self.errors += 1
+                logger.exception("Polling der Datenversionen fehlgeschlagen")
+                self._reset_connection()
+
+    def _reset_connection(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.poll()  # Ausgangslage
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._reset_connection()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "interval_seconds": self.interval,
+            "polls": self.polls,
+            "reloads": self.reloads,
+            "invalidated_scopes": self.invalidated_scopes,
+            "errors": self.errors,
+        }
@@ -0,0 +1,163 @@
+"""Live-Punktestand per WebSocket: Stand im Speicher halten, nur Änderungen verteilen.
+
+Pro Turnier mit mindestens einem Abonnenten hält der Hub Spiele und Punktestand.
+Ein Ergebnis wird einmal gegen diesen Stand gediffed (O(1)); die fertige Nachricht
+geht dann an alle Abonnenten (O(Abonnenten)). Ohne Abonnenten kostet ein Publish
+nur einen Dict-Lookup. Der Stand lebt pro Prozess; Ergebnisse aus anderen
+Workern kommen über den Invalidierungs-Bus (``refresh_live_scoreboards``) an.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+LIVE_QUEUE_SIZE = int(os.environ.get("LIVE_QUEUE_SIZE", "64"))
+
+# Nachricht an Abonnenten, deren Warteschlange übergelaufen ist: vollständigen Stand neu senden
+RESYNC = {"type": "resync"}
+
+Subscriber = Tuple[asyncio.AbstractEventLoop, asyncio.Queue]
+
+
+class _Channel:
+    def __init__(self) -> None:
+        self.subscribers: List[Subscriber] = []
+        self.games: Optional[Dict[int, dict]] = None
+        self.scores: Dict[int, dict] = {}
+        # Ergebnisse, die eintreffen, während der erste Stand noch geladen wird
+        self.pending: List[dict] = []
+
+
+def sorted_scores(scores: Dict[int, dict]) -> List[dict]:
+    """Reihenfolge wie ``compute_scoreboard``: Punkte absteigend, dann Paarungs-ID."""
+    return sorted(scores.values(), key=lambda row: (-row["points"], row["pairing_id"]))
+
+
+def _offer(queue: asyncio.Queue, message: dict) -> None:
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        # Langsamer Client: Rückstand verwerfen, er bekommt stattdessen den ganzen Stand
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC)
+
+
+class ScoreboardHub:
+    def __init__(self, queue_size: int = LIVE_QUEUE_SIZE) -> None:
+        self.queue_size = queue_size
+        self._channels: Dict[int, _Channel] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, tournament_id: int) -> asyncio.Queue:
+        """Meldet einen Abonnenten an (im Event-Loop aufrufen), noch bevor der Stand geladen ist."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            channel = self._channels.setdefault(tournament_id, _Channel())
+            channel.subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, tournament_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            channel = self._channels.get(tournament_id)
+            if channel is None:
+                return
+            channel.subscribers = [sub for sub in channel.subscribers if sub[1] is not queue]
+            if not channel.subscribers:
+                del self._channels[tournament_id]
+
+    def initialize(self, tournament_id: int, games: List[dict], scores: List[dict]) -> Dict[str, Any]:
+        """
+        Übernimmt einen frisch geladenen Stand, falls noch keiner vorliegt, und liefert
+        den aktuellen Stand des Hubs (kann durch zwischenzeitliche Ergebnisse neuer sein).
+        """
+        with self._lock:
+            channel = self._channels.setdefault(tournament_id, _Channel())
+            if channel.games is None:
+                channel.games = {game["id"]: dict(game) for game in games}
+                channel.scores = {row["pairing_id"]: dict(row) for row in scores}
+                self._apply(channel, channel.pending)
+                channel.pending = []
+            return self._state(channel)
+
+    def state(self, tournament_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            channel = self._channels.get(tournament_id)
+            if channel is None or channel.games is None:
+                return None
+            return self._state(channel)
+
+    @staticmethod
+    def _state(channel: _Channel) -> Dict[str, Any]:
+        return {
+            "type": "snapshot",
+            "games": [dict(game) for game in channel.games.values()],
+            "scores": [dict(row) for row in sorted_scores(channel.scores)],
+        }
+
+    def publish(self, tournament_id: int, games: List[dict]) -> None:
+        """Nach dem Commit aus beliebigem Thread aufrufen; verteilt nur geänderte Spiele und Zeilen."""
+        with self._lock:
+            channel = self._channels.get(tournament_id)
+            if channel is None:
+                return
+            if channel.games is None:
+                channel.pending.extend(games)
+                return
+            changed_games, changed_scores = self._apply(channel, games)
+            if not changed_games:
+                return
+            message = {
+                "type": "update",
+                "games": changed_games,
+                "scores": [dict(channel.scores[pid]) for pid in sorted(changed_scores)],
+            }
+            subscribers = list(channel.subscribers)
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:
+                # Event-Loop bereits geschlossen
+                pass
+
+    @staticmethod
+    def _apply(channel: _Channel, games: List[dict]) -> Tuple[List[dict], set]:
+        """Wendet Ergebnisse idempotent an: maßgeblich ist der Gewinner, nicht die Differenz."""
+        changed_games: List[dict] = []
+        changed_scores: set = set()
+        for game in games:
+            current = channel.games.get(game["id"])
+            if current is None or current["winner_pairing_id"] == game["winner_pairing_id"]:
+                continue
+            old_winner, new_winner = current["winner_pairing_id"], game["winner_pairing_id"]
+            pairing_ids = (game["pairing1_id"], game["pairing2_id"])
+            played_delta = (new_winner is not None) - (old_winner is not None)
+            for pairing_id in pairing_ids:
+                row = channel.scores.get(pairing_id)
+                if row is None:
+                    continue
+                won_delta = (pairing_id == new_winner) - (pairing_id == old_winner)
+                row["games_played"] += played_delta
+                row["games_won"] += won_delta
+                row["points"] += won_delta  # Jeder Sieg = 1 Punkt
+                changed_scores.add(pairing_id)
+            channel.games[game["id"]] = dict(game)
+            changed_games.append(dict(game))
+        return changed_games, changed_scores
+
+    def watched(self) -> List[int]:
+        """Turniere mit geladenem Stand, also mit mindestens einem Abonnenten."""
+        with self._lock:
+            return [tid for tid, channel in self._channels.items() if channel.games is not None]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "channels": len(self._channels),
+                "subscribers": sum(len(channel.subscribers) for channel in self._channels.values()),
+            }
+
+
+scoreboard_hub = ScoreboardHub()
@@ -0,0 +1,121 @@
+"""Volltextsuche über den Chat-Verlauf.
+
+Unter SQLite liegt ``messages_fts`` als FTS5-Tabelle (External Content) über
+``messages.content``/``messages.response``; Trigger halten sie bei jedem INSERT,
+UPDATE und DELETE synchron. Andere Datenbanken fallen auf eine LIKE-Suche zurück.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session
+
+from app.models.message import Message
+
+FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "content, response, content='messages', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, content, response) VALUES (new.id, new.content, new.response); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content, response) "
+    "VALUES ('delete', old.id, old.content, old.response); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content, response) "
+    "VALUES ('delete', old.id, old.content, old.response); "
+    "INSERT INTO messages_fts(rowid, content, response) VALUES (new.id, new.content, new.response); "
+    "END",
+]
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_message_search(db: Session) -> None:
+    """Legt FTS-Tabelle und Trigger an und indexiert vorhandene Nachrichten (nur SQLite)."""
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    for statement in FTS_DDL:
+        db.execute(text(statement))
+    db.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+
+
+def fts_query(query: str) -> Optional[str]:
+    """
+    Wandelt Benutzereingaben in eine sichere FTS5-Abfrage: jeder Begriff als Phrase,
+    alle Begriffe müssen vorkommen. Bewusst ohne Präfixsuche, die ohne Präfix-Index
+    alle passenden Terme expandieren müsste.
+    """
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def search_messages(
+    db: Session, query: str, limit: int, after: Optional[Tuple[Optional[float], int]] = None
+) -> List[dict]:
+    """
+    Liefert bis zu ``limit`` Treffer, relevanteste zuerst (bm25, kleiner = besser), mit
+    Snippets. Seitenweise über ``after = (rank, id)`` des letzten Treffers (Keyset auf
+    ``(rank, id)``). Neue Nachrichten verschieben die bm25-Werte; eine laufende
+    Blättersequenz kann dann Treffer doppelt oder gar nicht zeigen.
+    Ohne FTS5 gibt es keine Relevanz; dort gilt neueste zuerst (Keyset auf ``id``).
+    """
+    match = fts_query(query)
+    if match is None:
+        return []
+
+    if db.get_bind().dialect.name == "sqlite":
+        keyset = ""
+        params = {"match": match, "limit": limit}
+        if after is not None:
+            keyset = (
+                "AND (bm25(messages_fts) > :rank "
+                "OR (bm25(messages_fts) = :rank AND messages_fts.rowid > :after_id)) "
+            )
+            params.update(rank=after[0], after_id=after[1])
+        rows = db.execute(
+            text(
+                "SELECT m.id, m.content, m.response, m.created_at, "
+                "snippet(messages_fts, 0, '[', ']', '…', 12), "
+                "snippet(messages_fts, 1, '[', ']', '…', 12), "
+                "bm25(messages_fts) "
+                "FROM messages_fts JOIN messages AS m ON m.id = messages_fts.rowid "
+                f"WHERE messages_fts MATCH :match {keyset}"
+                "ORDER BY bm25(messages_fts), messages_fts.rowid LIMIT :limit"
+            ),
+            params,
+        ).all()
+    else:
+        conditions = []
+        for term in _TERM.findall(query):
+            pattern = f"%{term}%"
+            conditions.append(or_(Message.content.ilike(pattern), Message.response.ilike(pattern)))
+        statement = db.query(
+            Message.id, Message.content, Message.response, Message.created_at
+        ).filter(*conditions)
+        if after is not None:
+            statement = statement.filter(Message.id < after[1])
+        rows = [
+            (*row, None, None, None)
+            for row in statement.order_by(Message.id.desc()).limit(limit)
+        ]
+
+    results = []
+    for message_id, content, response, created_at, content_snippet, response_snippet, rank in rows:
+        if created_at is not None and not isinstance(created_at, str):
+            created_at = created_at.isoformat()
+        results.append({
+            "id": message_id,
+            "message": content,
+            "response": response,
+            "created_at": created_at,
+            "message_snippet": content_snippet,
+            "response_snippet": response_snippet,
+            "rank": rank,
+        })
+    return results
@@ -0,0 +1,114 @@
+"""Write-Behind für Chat-Nachrichten.
+
+Der Chat-Endpunkt legt Nachrichten nur in eine Warteschlange; ein eigener Thread
+schreibt sie gesammelt (ein Commit pro Batch) in ``messages``. So wartet keine
+Antwort und kein anderer Coroutine im Event-Loop auf den SQLite-fsync.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.message import Message
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_BATCH_SIZE = int(os.environ.get("MESSAGE_BATCH_SIZE", "100"))
+MESSAGE_FLUSH_INTERVAL = float(os.environ.get("MESSAGE_FLUSH_INTERVAL", "0.05"))
+
+_STOP = object()
+
+
+class MessageWriter:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int = MESSAGE_BATCH_SIZE,
+        flush_interval: float = MESSAGE_FLUSH_INTERVAL,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, row: dict) -> None:
+        """Übernimmt eine Zeile für ``messages``; startet den Writer bei Bedarf."""
+        self.start()
+        self._queue.put(row)
+
+    def flush(self) -> None:
+        """Blockiert, bis alle bisher eingereihten Nachrichten geschrieben sind."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self) -> None:
+        """Schreibt ausstehende Nachrichten und beendet den Thread (beim Shutdown)."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch: List[dict] = [item]
+            stop = False
+            # Kurz nachsammeln, damit gleichzeitig eintreffende Nachrichten einen Commit teilen
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch: List[dict]) -> None:
+        try:
+            with self.session_factory() as db:
+                db.execute(insert(Message), batch)
+                db.commit()
+            self.written += len(batch)
+            self.batches += 1
+        except Exception:
+            self.errors += 1
+            logger.exception("Schreiben von %d Chat-Nachrichten fehlgeschlagen", len(batch))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
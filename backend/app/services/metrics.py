@@ -0,0 +1,279 @@
+"""SQL-Zählung pro Request, Server-Timing-Header und Prometheus-Metriken."""
+
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Label für Requests ohne passende Route, damit unbekannte Pfade keine neuen Serien erzeugen
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestMetrics:
+    """Sammelt die Datenbankarbeit eines einzelnen Requests."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Wird von der Middleware gesetzt; Threadpool-Aufrufe erben den Kontext und damit dasselbe Objekt
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+class Histogram:
+    """Kumulatives Histogramm im Prometheus-Sinn (nicht threadsicher, Lock hält die Registry)."""
+
+    def __init__(self, buckets: Iterable[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Mapping[str, str]) -> str:
+    return ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Aggregiert Request-Dauer, Query-Anzahl und DB-Zeit pro Methode und Routen-Template."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.durations: Dict[Tuple[str, str], Histogram] = {}
+        self.query_counts: Dict[Tuple[str, str], Histogram] = {}
+        self.db_durations: Dict[Tuple[str, str], Histogram] = {}
+        self.queries_total = 0
+        self.db_seconds_total = 0.0
+        self.lock_errors_total = 0
+
+    def observe_query(self, seconds: float) -> None:
+        with self._lock:
+            self.queries_total += 1
+            self.db_seconds_total += seconds
+
+    def observe_lock_error(self) -> None:
+        """SQLite hat trotz busy_timeout aufgegeben (``database is locked``)."""
+        with self._lock:
+            self.lock_errors_total += 1
+
+    def observe_request(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        request: RequestMetrics,
+    ) -> None:
+        key = (method, route)
+        with self._lock:
+            status_key = (method, route, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            self.durations.setdefault(key, Histogram(DURATION_BUCKETS)).observe(seconds)
+            self.query_counts.setdefault(key, Histogram(QUERY_BUCKETS)).observe(request.queries)
+            self.db_durations.setdefault(key, Histogram(DURATION_BUCKETS)).observe(request.db_seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.durations.clear()
+            self.query_counts.clear()
+            self.db_durations.clear()
+            self.queries_total = 0
+            self.db_seconds_total = 0.0
+            self.lock_errors_total = 0
+
+    def render(self, gauges: Optional[Mapping[str, Mapping[str, Any]]] = None) -> str:
+        """
+        Liefert alle Metriken im Prometheus-Textformat. ``gauges`` ordnet einem Präfix
+        ein Stats-Dict zu (z.B. Pool- oder Ollama-Statistik); numerische Werte werden
+        als ``<präfix>_<schlüssel>`` ausgegeben, Schlüssel auf ``_total`` als Counter.
+        """
+        lines: List[str] = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_total Anzahl Requests nach Methode, Route und Status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                labels = _labels({"method": method, "route": route, "status": status})
+                lines.append(f"http_requests_total{{{labels}}} {count}")
+
+            self._render_histograms(
+                lines, "http_request_duration_seconds", "Gesamtdauer pro Request.", self.durations,
+            )
+            self._render_histograms(
+                lines, "http_request_db_queries", "SQL-Statements pro Request.", self.query_counts,
+            )
+            self._render_histograms(
+                lines, "http_request_db_seconds", "Datenbankzeit pro Request.", self.db_durations,
+            )
+
+            lines += [
+                "# HELP db_queries_total Alle ausgeführten SQL-Statements.",
+                "# TYPE db_queries_total counter",
+                f"db_queries_total {self.queries_total}",
+                "# HELP db_query_seconds_total Summierte Datenbankzeit aller SQL-Statements.",
+                "# TYPE db_query_seconds_total counter",
+                f"db_query_seconds_total {_number(round(self.db_seconds_total, 6))}",
+                "# HELP db_lock_errors_total Statements, die mit 'database is locked' abgebrochen sind.",
+                "# TYPE db_lock_errors_total counter",
+                f"db_lock_errors_total {self.lock_errors_total}",
+                "# HELP process_pid Prozess-ID des Workers (zum Zusammenführen mehrerer Worker).",
+                "# TYPE process_pid gauge",
+                f"process_pid {os.getpid()}",
+            ]
+
+        for prefix, stats in (gauges or {}).items():
+            for key, value in stats.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                kind = "counter" if key.endswith("_total") else "gauge"
+                lines += [f"# TYPE {name} {kind}", f"{name} {_number(value)}"]
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(
+        lines: List[str],
+        name: str,
+        help_text: str,
+        histograms: Dict[Tuple[str, str], Histogram],
+    ) -> None:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (method, route), histogram in sorted(histograms.items()):
+            labels = _labels({"method": method, "route": route})
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{{{labels},le="{_number(float(bound))}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{labels}}} {_number(round(histogram.sum, 6))}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+metrics_registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    metrics_registry.observe_query(elapsed)
+    request = _current.get()
+    if request is not None:
+        request.queries += 1
+        request.db_seconds += elapsed
+
+
+def _is_lock_error(exc: BaseException) -> bool:
+    # SQLITE_BUSY und SQLITE_LOCKED
+    message = str(exc).lower()
+    return "database is locked" in message or "database table is locked" in message
+
+
+def _handle_error(exception_context) -> None:
+    # Fehlgeschlagene Statements lösen kein after_cursor_execute aus
+    connection = exception_context.connection
+    if (
+        exception_context.cursor is not None
+        and connection is not None
+        and connection.info.get("query_started")
+    ):
+        connection.info["query_started"].pop()
+    if _is_lock_error(exception_context.original_exception):
+        metrics_registry.observe_lock_error()
+
+
+def instrument_engine(target: Engine) -> None:
+    """Misst alle SQL-Statements der Engine; mehrfacher Aufruf ist unschädlich."""
+    if event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+
+
+def _server_timing(request: RequestMetrics, seconds: float) -> str:
+    return (
+        f'db;dur={request.db_seconds * 1000:.2f};desc="{request.queries} queries", '
+        f"total;dur={seconds * 1000:.2f}"
+    )
+
+
+class MetricsMiddleware:
+    """
+    ASGI-Middleware: zählt SQL-Statements und DB-Zeit pro Request, setzt ``Server-Timing``
+    und trägt Dauer/Queries unter dem Routen-Template (z.B. ``/api/tournaments/{tournament_id}``)
+    in die Registry ein.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics_registry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics()
+        token = _current.set(request)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = _server_timing(request, time.perf_counter() - started)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            self.registry.observe_request(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status,
+                time.perf_counter() - started,
+                request,
+            )
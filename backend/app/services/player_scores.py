@@ -0,0 +1,206 @@
+"""Pflege der Punkte-Rollup-Tabelle ``player_tournament_scores``.
+
+Alle Funktionen schreiben nur in die übergebene Session; committet wird vom
+Aufrufer, damit Rollup und Spieldaten in derselben Transaktion landen.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session
+
+from app.models.game import Game
+from app.models.pairing import Pairing
+from app.models.player_score import PlayerTournamentScore
+from app.models.tournament import Tournament
+
+
+def init_tournament_scores(db: Session, tournament_id: int, year: int, pairs: Iterable[Tuple[int, int]]) -> None:
+    """Legt für jeden Spieler eines neuen Turniers eine leere Rollup-Zeile an."""
+    rows = []
+    for player1_id, player2_id in pairs:
+        for player_id, partner_id in ((player1_id, player2_id), (player2_id, player1_id)):
+            rows.append({
+                "player_id": player_id,
+                "tournament_id": tournament_id,
+                "year": year,
+                "partner_id": partner_id,
+                "points": 0,
+                "games_played": 0,
+            })
+    if rows:
+        db.execute(PlayerTournamentScore.__table__.insert(), rows)
+
+
+def delete_tournament_scores(db: Session, tournament_id: int) -> None:
+    """Entfernt die Rollup-Zeilen eines gelöschten Turniers."""
+    db.query(PlayerTournamentScore).filter(
+        PlayerTournamentScore.tournament_id == tournament_id
+    ).delete(synchronize_session=False)
+
+
+def record_game_result(
+    db: Session,
+    game: Game,
+    previous_winner_id: Optional[int],
+    pairing_players: Optional[Dict[int, Tuple[int, int]]] = None,
+) -> None:
+    """Überträgt einen geänderten Gewinner eines Spiels in das Rollup."""
+    record_game_results(db, [(game, previous_winner_id)], pairing_players)
+
+
+def record_game_results(
+    db: Session,
+    changes: Iterable[Tuple[Game, Optional[int]]],
+    pairing_players: Optional[Dict[int, Tuple[int, int]]] = None,
+) -> None:
+    """
+    Überträgt geänderte Gewinner mehrerer Spiele (Spiel, bisheriger Gewinner) in das Rollup.
+
+    ``pairing_players`` (Paarungs-ID → Spieler-IDs) kann übergeben werden, wenn die
+    Paarungen bereits geladen sind; sonst wird es mit einer Query ermittelt.
+    """
+    changes = [
+        (game, previous_winner_id)
+        for game, previous_winner_id in changes
+        if previous_winner_id != game.winner_pairing_id
+    ]
+    if not changes:
+        return
+
+    if pairing_players is None:
+        pairing_ids = {
+            pairing_id for game, _ in changes for pairing_id in (game.pairing1_id, game.pairing2_id)
+        }
+        pairing_players = {
+            pairing_id: (player1_id, player2_id)
+            for pairing_id, player1_id, player2_id in db.query(
+                Pairing.id, Pairing.player1_id, Pairing.player2_id
+            ).filter(Pairing.id.in_(pairing_ids))
+        }
+
+    # Deltas je (Turnier, Spieler): (Punkte, gespielte Spiele)
+    deltas: Dict[Tuple[int, int], List[int]] = defaultdict(lambda: [0, 0])
+    for game, previous_winner_id in changes:
+        new_winner_id = game.winner_pairing_id
+        played_delta = 0
+        if previous_winner_id is None:
+            played_delta = 1
+        elif new_winner_id is None:
+            played_delta = -1
+        if played_delta:
+            for pairing_id in (game.pairing1_id, game.pairing2_id):
+                for player_id in pairing_players.get(pairing_id, ()):
+                    deltas[(game.tournament_id, player_id)][1] += played_delta
+        if previous_winner_id is not None:
+            for player_id in pairing_players.get(previous_winner_id, ()):
+                deltas[(game.tournament_id, player_id)][0] -= 1
+        if new_winner_id is not None:
+            for player_id in pairing_players.get(new_winner_id, ()):
+                deltas[(game.tournament_id, player_id)][0] += 1
+
+    # Spieler mit gleichem Delta in einem UPDATE zusammenfassen
+    grouped: Dict[Tuple[int, int, int], List[int]] = defaultdict(list)
+    for (tournament_id, player_id), (points_delta, games_delta) in deltas.items():
+        if points_delta or games_delta:
+            grouped[(tournament_id, points_delta, games_delta)].append(player_id)
+
+    for (tournament_id, points_delta, games_delta), player_ids in grouped.items():
+        db.query(PlayerTournamentScore).filter(
+            PlayerTournamentScore.tournament_id == tournament_id,
+            PlayerTournamentScore.player_id.in_(player_ids),
+        ).update(
+            {
+                PlayerTournamentScore.points: PlayerTournamentScore.points + points_delta,
+                PlayerTournamentScore.games_played: PlayerTournamentScore.games_played + games_delta,
+            },
+            synchronize_session=False,
+        )
+
+
+def compute_player_scores(db: Session) -> Dict[Tuple[int, int], dict]:
+    """Berechnet das komplette Rollup direkt aus ``games`` (Schlüssel: Spieler, Turnier)."""
+    games_won = func.coalesce(
+        func.sum(case((Game.winner_pairing_id == Pairing.id, 1), else_=0)), 0
+    )
+    games_played = func.coalesce(
+        func.sum(case((Game.winner_pairing_id.isnot(None), 1), else_=0)), 0
+    )
+    rows = (
+        db.query(
+            Pairing.tournament_id,
+            Tournament.year,
+            Pairing.player1_id,
+            Pairing.player2_id,
+            games_won,
+            games_played,
+        )
+        .join(Tournament, Tournament.id == Pairing.tournament_id)
+        .outerjoin(
+            Game,
+            and_(
+                Game.tournament_id == Pairing.tournament_id,
+                or_(Game.pairing1_id == Pairing.id, Game.pairing2_id == Pairing.id),
+            ),
+        )
+        .group_by(Pairing.id, Pairing.tournament_id, Tournament.year, Pairing.player1_id, Pairing.player2_id)
+        .order_by(Pairing.id)
+        .all()
+    )
+
+    scores: Dict[Tuple[int, int], dict] = {}
+    for tournament_id, year, player1_id, player2_id, won, played in rows:
+        for player_id, partner_id in ((player1_id, player2_id), (player2_id, player1_id)):
+            entry = scores.setdefault((player_id, tournament_id), {
+                "player_id": player_id,
+                "tournament_id": tournament_id,
+                "year": year,
+                "partner_id": partner_id,
+                "points": 0,
+                "games_played": 0,
+            })
+            entry["points"] += int(won)
+            entry["games_played"] += int(played)
+    return scores
+
+
+def rebuild_player_scores(db: Session) -> List[dict]:
+    """
+    Baut das Rollup aus ``games`` neu auf und liefert die Abweichungen zum bisherigen
+    Stand (leere Liste = Rollup war korrekt). Committet nicht.
+    """
+    expected = compute_player_scores(db)
+    current = {
+        (row.player_id, row.tournament_id): row
+        for row in db.query(PlayerTournamentScore).all()
+    }
+
+    mismatches = []
+    for key in sorted(set(expected) | set(current)):
+        want = expected.get(key)
+        have = current.get(key)
+        want_values = (want["points"], want["games_played"]) if want else None
+        have_values = (have.points, have.games_played) if have else None
+        if want_values != have_values:
+            mismatches.append({
+                "player_id": key[0],
+                "tournament_id": key[1],
+                "expected": want_values,
+                "stored": have_values,
+            })
+
+    db.query(PlayerTournamentScore).delete(synchronize_session=False)
+    if expected:
+        db.execute(PlayerTournamentScore.__table__.insert(), list(expected.values()))
+    return mismatches
+
+
+def backfill_player_scores(db: Session) -> bool:
+    """Füllt ein leeres Rollup für bestehende Datenbanken auf (ohne Commit). Liefert True, wenn gebaut wurde."""
+    if db.query(PlayerTournamentScore.player_id).first() is not None:
+        return False
+    if db.query(Pairing.id).first() is None:
+        return False
+    rebuild_player_scores(db)
+    return True
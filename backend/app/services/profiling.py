@@ -0,0 +1,190 @@
+"""Opt-in-Profiling einzelner Requests mit einem Stack-Sampler (Collapsed-Stack-Format)."""
+
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import List, Optional
+
+import anyio
+from fastapi.concurrency import run_in_threadpool
+
+PROFILE_ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_CAPTURES = int(os.environ.get("PROFILE_MAX_CAPTURES", "50"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "")
+
+# Blattfunktionen wartender Threads (Threadpool, Event-Loop, Writer) – kein Beitrag zur Request-Zeit
+IDLE_FUNCTIONS = frozenset({"wait", "select", "poll", "_worker_loop"})
+MAX_STACK_DEPTH = 128
+
+_REQUEST_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def profiling_enabled() -> bool:
+    """Ohne Token und Sampling-Rate wird die Middleware gar nicht erst eingehängt."""
+    return bool(PROFILE_ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(PROFILE_ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Tastet in einem Hintergrund-Thread alle ``interval`` Sekunden die Stacks aller
+    übrigen Threads ab und zählt sie. Erfasst wird Wall-Clock-Zeit prozessweit:
+    parallel laufende Requests erscheinen mit im Profil.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or frame.f_code.co_name in IDLE_FUNCTIONS:
+                    continue
+                labels: List[str] = []
+                while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Format von ``flamegraph.pl``/speedscope: ``wurzel;...;blatt anzahl`` pro Zeile."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Hält die letzten ``maxsize`` Aufzeichnungen; optional zusätzlich als Datei in ``directory``."""
+
+    def __init__(self, maxsize: int, directory: str = "") -> None:
+        self.maxsize = maxsize
+        self.directory = directory
+        self._captures: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, capture: dict) -> None:
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{capture['request_id']}.collapsed")
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write(capture["collapsed"])
+        with self._lock:
+            self._captures[capture["request_id"]] = capture
+            while len(self._captures) > self.maxsize:
+                self._captures.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._captures.get(request_id)
+
+    def recent(self) -> List[dict]:
+        """Neueste zuerst, ohne die Stacks selbst."""
+        with self._lock:
+            captures = list(self._captures.values())
+        return [
+            {key: value for key, value in capture.items() if key != "collapsed"}
+            for capture in reversed(captures)
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._captures.clear()
+
+
+profile_store = ProfileStore(PROFILE_MAX_CAPTURES, PROFILE_DIR)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    Profiliert einen Request, wenn ``X-Profile: 1`` mit gültigem ``X-Admin-Token``
+    gesendet wird oder er per ``PROFILE_SAMPLE_RATE`` zufällig gezogen wird. Die
+    Aufzeichnung liegt unter der Request-ID (``X-Request-ID`` oder neu erzeugt),
+    die als ``X-Profile-Id`` zurückgegeben wird.
+    """
+
+    def __init__(self, app, store: ProfileStore = profile_store) -> None:
+        self.app = app
+        self.store = store
+
+    def _should_profile(self, scope) -> bool:
+        if _header(scope, b"x-profile") == "1" and is_admin(_header(scope, b"x-admin-token")):
+            return True
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _header(scope, b"x-request-id") or ""
+        if not _REQUEST_ID.fullmatch(request_id):
+            # Wird auch als Dateiname verwendet, fremde Werte daher nur in harmloser Form
+            request_id = uuid.uuid4().hex
+        status = 500
+
+        async def send_with_id(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            capture = {
+                "request_id": request_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            # Thread-Join und Dateischreiben blockieren, daher im Threadpool; abgeschirmt,
+            # damit auch abgebrochene Requests ihre Aufzeichnung behalten
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(self._finish, sampler, capture)
+
+    def _finish(self, sampler: StackSampler, capture: dict) -> None:
+        sampler.stop()
+        self.store.add({**capture, "samples": sampler.samples, "collapsed": sampler.collapsed()})
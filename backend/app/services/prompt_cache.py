@@ -0,0 +1,108 @@
+"""Antwort-Cache für den KI-Chat.
+
+Zwei Stufen: ein In-Memory-LRU mit TTL und dahinter die Tabelle ``messages``,
+in der jede Antwort mit ``prompt_key`` (Hash aus Modell und normalisiertem
+Prompt) abgelegt ist. Treffer aus der Datenbank wandern in den LRU.
+"""
+
+import hashlib
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.message import Message
+from app.services.cache import LRUCache
+
+AI_CACHE_ENABLED = os.environ.get("AI_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+AI_CACHE_SIZE = int(os.environ.get("AI_CACHE_SIZE", "512"))
+AI_CACHE_TTL_SECONDS = float(os.environ.get("AI_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Vereinheitlicht Groß-/Kleinschreibung und Leerraum, damit gleiche Fragen gleich aussehen."""
+    return _WHITESPACE.sub(" ", prompt).strip().casefold()
+
+
+def prompt_key(prompt: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+
+def message_to_dict(entry: Message) -> dict:
+    return {
+        "id": entry.id,
+        "message": entry.content,
+        "response": entry.response,
+        "created_at": entry.created_at.isoformat() if entry.created_at else None,
+    }
+
+
+class PromptCache:
+    def __init__(self, maxsize: int, ttl: float, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.ttl = ttl
+        self.memory = LRUCache(maxsize, ttl=ttl)
+        self.db_hits = 0
+        self.misses = 0
+        # Fehlgriffe, die dann doch eine geteilte Antwort eines laufenden Aufrufs bekamen
+        self.coalesced_hits = 0
+
+    def _is_fresh(self, created_at: Optional[datetime]) -> bool:
+        if created_at is None:
+            return False
+        if created_at.tzinfo is None:
+            # SQLite liefert CURRENT_TIMESTAMP ohne Zeitzone (UTC)
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - created_at <= timedelta(seconds=self.ttl)
+
+    def lookup(self, db: Session, prompt: str, model: str) -> Optional[dict]:
+        """Sucht eine gespeicherte Antwort erst im LRU, dann über den Index in ``messages``."""
+        if not self.enabled:
+            return None
+        key = prompt_key(prompt, model)
+        cached = self.memory.get(key)
+        if cached is not None:
+            return cached
+
+        entry = (
+            db.query(Message)
+            .filter(Message.prompt_key == key)
+            .order_by(Message.id.desc())
+            .first()
+        )
+        if entry is None or not self._is_fresh(entry.created_at):
+            self.misses += 1
+            return None
+        self.db_hits += 1
+        result = message_to_dict(entry)
+        self.memory.put(key, result)
+        return result
+
+    def store(self, prompt: str, model: str, result: dict) -> None:
+        if self.enabled:
+            self.memory.put(prompt_key(prompt, model), result)
+
+    def count_coalesced(self) -> None:
+        """Bucht einen vorherigen Fehlgriff von ``lookup`` in einen geteilten Treffer um."""
+        if self.enabled:
+            self.misses -= 1
+        self.coalesced_hits += 1
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "enabled": self.enabled,
+            "memory_hits": self.memory.hits,
+            "db_hits": self.db_hits,
+            "coalesced_hits": self.coalesced_hits,
+            "misses": self.misses,
+            "entries": len(self.memory),
+            "max_entries": self.memory.maxsize,
+            "ttl_seconds": self.ttl,
+        }
+
+
+prompt_cache = PromptCache(AI_CACHE_SIZE, AI_CACHE_TTL_SECONDS, AI_CACHE_ENABLED)
@@ -0,0 +1,103 @@
+"""Partner-Rotation für beliebige Spielerzahlen.
+
+Die Rundentabelle (Circle-Method, bei ungerader Anzahl mit Freilos) hängt nur von
+der Besetzung ab und wird pro Besetzung gecacht. Für ein Turnier wird die Runde
+gewählt, die am wenigsten Partnerschaften aus früheren Monaten desselben Jahres
+wiederholt; bei Gleichstand gilt die bisherige Monatsrotation.
+"""
+
+import os
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.pairing import Pairing
+from app.models.tournament import Tournament
+
+ROTATION_CACHE_SIZE = int(os.environ.get("ROTATION_CACHE_SIZE", "128"))
+
+# Mindestens zwei Paarungen, sonst gibt es keine Spiele
+MIN_PLAYERS = 4
+
+Pair = Tuple[int, int]
+
+
+class Round(NamedTuple):
+    pairs: Tuple[Pair, ...]
+    byes: Tuple[int, ...]
+
+
+@lru_cache(maxsize=ROTATION_CACHE_SIZE)
+def round_table(roster: Tuple[int, ...]) -> Tuple[Round, ...]:
+    """
+    Alle Runden eines Partner-Round-Robins für die (sortierte) Besetzung ``roster``:
+    bei gerader Anzahl N-1 Runden, bei ungerader N Runden mit je einem Freilos.
+    Über alle Runden kommt jede Partnerschaft genau einmal vor.
+    """
+    players: List[Optional[int]] = list(roster)
+    if len(players) % 2:
+        players.append(None)  # Freilos
+    n = len(players)
+
+    rounds: List[Round] = []
+    for _ in range(n - 1):
+        pairs: List[Pair] = []
+        byes: List[int] = []
+        for i in range(n // 2):
+            p1, p2 = players[i], players[n - 1 - i]
+            if p1 is None or p2 is None:
+                byes.append(p1 if p2 is None else p2)
+            else:
+                pairs.append((min(p1, p2), max(p1, p2)))
+        rounds.append(Round(tuple(pairs), tuple(byes)))
+        # Rotation (erster Spieler bleibt fix)
+        players = [players[0]] + [players[-1]] + players[1:-1]
+    return tuple(rounds)
+
+
+def normalize_roster(player_ids: Iterable[int]) -> Tuple[int, ...]:
+    roster = tuple(sorted(set(player_ids)))
+    if len(roster) < MIN_PLAYERS:
+        raise ValueError(f"Es müssen mindestens {MIN_PLAYERS} Spieler teilnehmen. Aktuell: {len(roster)}")
+    return roster
+
+
+def select_round(
+    player_ids: Iterable[int],
+    month: int,
+    used_pairs: Optional[Counter] = None,
+) -> Round:
+    """
+    Wählt die Runde mit den wenigsten bereits gespielten Partnerschaften (``used_pairs``);
+    bei Gleichstand die Runde ``(month - 1) % Rundenzahl`` bzw. die nächste danach.
+    """
+    rounds = round_table(normalize_roster(player_ids))
+    preferred = (month - 1) % len(rounds)
+    used = used_pairs or Counter()
+
+    def cost(index: int) -> Tuple[int, int]:
+        repeats = sum(used[pair] for pair in rounds[index].pairs)
+        return repeats, (index - preferred) % len(rounds)
+
+    return rounds[min(range(len(rounds)), key=cost)]
+
+
+def used_partnerships(db: Session, year: int, before_month: int) -> Counter:
+    """Zählt die Partnerschaften aller Turniere des Jahres vor ``before_month`` (eine Query)."""
+    rows = (
+        db.query(Pairing.player1_id, Pairing.player2_id)
+        .join(Tournament, Tournament.id == Pairing.tournament_id)
+        .filter(Tournament.year == year, Tournament.month < before_month)
+    )
+    return Counter((min(p1, p2), max(p1, p2)) for p1, p2 in rows)
+
+
+def matchups(pairing_ids: Sequence[int]) -> List[Tuple[int, int]]:
+    """Jede Paarung gegen jede andere (k·(k-1)/2 Begegnungen)."""
+    return [
+        (pairing1_id, pairing2_id)
+        for i, pairing1_id in enumerate(pairing_ids)
+        for pairing2_id in pairing_ids[i + 1:]
+    ]
@@ -0,0 +1,66 @@
+"""Datenversionen für Conditional GETs und Caches.
+
+Jeder Schreibpfad erhöht in derselben Transaktion die betroffenen Zähler in
+``data_versions``. Da die Zähler in der Datenbank liegen, sehen alle Worker
+denselben Stand.
+"""
+
+import secrets
+from typing import Dict, Iterable
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.data_version import DataVersion
+
+GLOBAL_SCOPE = "global"
+# Zufallswert pro Datenbank (Migration); fließt in ETags ein, da Versionen auf einer
+# neu aufgesetzten Datenbank wieder bei 0 beginnen
+INSTANCE_SCOPE = "instance"
+
+
+def tournament_scope(tournament_id: int) -> str:
+    return f"tournament:{tournament_id}"
+
+
+def bump_versions(db: Session, *scopes: str) -> None:
+    """Erhöht die Versionen der angegebenen Bereiche (ohne Commit)."""
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    for scope in dict.fromkeys(scopes):
+        # Upsert: neue Bereiche starten bei 1, bestehende werden atomar erhöht
+        db.execute(
+            insert(DataVersion)
+            .values(scope=scope, version=1)
+            .on_conflict_do_update(
+                index_elements=[DataVersion.scope],
+                set_={"version": DataVersion.version + 1},
+            )
+        )
+
+
+def bump_tournament(db: Session, tournament_id: int) -> None:
+    """Markiert ein Turnier und die globalen Übersichten als geändert."""
+    bump_versions(db, GLOBAL_SCOPE, tournament_scope(tournament_id))
+
+
+def ensure_instance_id(db: Session) -> None:
+    """Legt die Kennung der Datenbank-Instanz an, falls sie noch fehlt (ohne Commit)."""
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    db.execute(
+        insert(DataVersion)
+        .values(scope=INSTANCE_SCOPE, version=secrets.randbits(62))
+        .on_conflict_do_nothing(index_elements=[DataVersion.scope])
+    )
+
+
+def get_version(db: Session, scope: str) -> int:
+    version = db.query(DataVersion.version).filter(DataVersion.scope == scope).scalar()
+    return version or 0
+
+
+def get_versions(db: Session, scopes: Iterable[str]) -> Dict[str, int]:
+    scopes = list(scopes)
+    rows = db.query(DataVersion.scope, DataVersion.version).filter(DataVersion.scope.in_(scopes))
+    versions = dict.fromkeys(scopes, 0)
+    versions.update({scope: version for scope, version in rows})
+    return versions
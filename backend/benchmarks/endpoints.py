@@ -0,0 +1,356 @@
+"""Latenz- und Query-Benchmark der Lese- und Schreib-Endpunkte bei wachsender Historie.
+
+Legt pro Datengröße (Standard: 1, 5, 20 und 50 Jahre monatlicher Turniere) eine
+eigene SQLite-Datei an und befüllt sie über die echte API (Bulk-Saison plus
+Bulk-Ergebnisse, also Modelle, Rollup und Versionen wie im Betrieb); dazu kommen
+Chat-Nachrichten direkt in der Tabelle, da es keinen Ollama gibt. Danach wird
+jeder Lese-Endpunkt ``--iterations`` mal aufgerufen; der Antwort-Cache wird vor
+jedem Aufruf geleert, gemessen wird also immer der Aufbau der Antwort. Ebenso oft
+laufen die Schreibpfade: Einzel- und Sammel-Ergebnis, Turnier anlegen und Saison
+anlegen (in Jahren nach der Historie). Die Query-Anzahl stammt aus dem
+``Server-Timing``-Header der Metrics-Middleware. Mit ``GAME_WRITE_QUEUE=true``
+in der Umgebung laufen die Ergebnis-Pfade über den Single-Writer; dessen Queries
+laufen in eigenem Thread und erscheinen nicht in der Query-Anzahl.
+
+Der Bericht (JSON) enthält p50/p95/p99 und Queries pro Endpunkt und Größe. Mit
+``--baseline`` wird gegen einen gespeicherten Bericht verglichen: steigt p95 um mehr
+als ``--threshold`` (relativ, plus ``--min-delta-ms`` absolut gegen Rauschen) oder
+steigt die Query-Anzahl überhaupt, endet der Lauf mit Exit-Code 1. Schreibpfade
+warten auf fsync und streuen entsprechend stärker; für sie gilt ``--write-threshold``.
+Bei weniger als ``MIN_TIMING_ITERATIONS`` Iterationen (in Lauf oder Baseline) ist
+p95 praktisch das Maximum eines Laufs; dann werden nur die Query-Anzahlen verglichen.
+
+Aufruf::
+
+    python -m benchmarks.endpoints --output bench.json
+    python -m benchmarks.endpoints --baseline benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.endpoints --save-baseline benchmarks/baseline.json
+
+``benchmarks/baseline.json`` ist ein Referenzlauf mit den Standardwerten. Absolute
+Zeiten hängen vom Rechner ab: für einen aussagekräftigen Vergleich zuerst auf dem
+eigenen Rechner mit ``--save-baseline`` eine Baseline vom Ausgangsstand erzeugen.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_SIZES = (1, 5, 20, 50)
+START_YEAR = 2000
+PLAYER_COUNT = 8
+MESSAGES_PER_YEAR = 50
+MIN_TIMING_ITERATIONS = 20
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(timings: List[float], queries: List[int]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "mean_ms": round(statistics.mean(ordered), 3),
+        "p50_ms": round(_percentile(ordered, 0.50), 3),
+        "p95_ms": round(_percentile(ordered, 0.95), 3),
+        "p99_ms": round(_percentile(ordered, 0.99), 3),
+        "queries": max(queries),
+    }
+
+
+def seed_history(client, years: int, seed: int = 42) -> Dict[str, Any]:
+    """Legt Spieler und ``years`` Saisons mit zufälligen, vollständigen Ergebnissen an."""
+    rng = random.Random(seed)
+    player_ids = [
+        client.post("/api/players", json={"name": f"Spieler {i}"}).json()["id"]
+        for i in range(1, PLAYER_COUNT + 1)
+    ]
+    tournaments: List[dict] = []
+    for year in range(START_YEAR, START_YEAR + years):
+        season = {"tournaments": [
+            {"name": f"Turnier {month}/{year}", "year": year, "month": month} for month in range(1, 13)
+        ]}
+        res = client.post("/api/tournaments/bulk", json=season)
+        res.raise_for_status()
+        for tournament in res.json():
+            games = client.get(f"/api/tournaments/{tournament['id']}/games").json()
+            results = [
+                {"game_id": g["id"], "winner_pairing_id": rng.choice((g["pairing1_id"], g["pairing2_id"]))}
+                for g in games
+            ]
+            client.patch(f"/api/tournaments/{tournament['id']}/games", json=results).raise_for_status()
+            tournaments.append(tournament)
+
+    last = tournaments[-1]
+    return {
+        "player_id": player_ids[0],
+        "tournament_id": last["id"],
+        "year": last["year"],
+        "latest_change": client.get("/api/changes", params={"limit": 1}).json()["latest"],
+    }
+
+
+def seed_messages(session_factory, count: int) -> None:
+    """Schreibt ``count`` Chat-Nachrichten direkt; die FTS-Trigger indexieren sie mit."""
+    from app.models.message import Message
+
+    with session_factory() as db:
+        db.add_all(
+            Message(
+                content=f"Wie viele Punkte hat Spieler {i % PLAYER_COUNT + 1} im Monat {i % 12 + 1}?",
+                response=f"Spieler {i % PLAYER_COUNT + 1} hat in diesem Monat {i % 7} Siege und damit {i % 7} Punkte.",
+            )
+            for i in range(count)
+        )
+        db.commit()
+
+
+def endpoints(ids: Dict[str, Any]) -> Dict[str, str]:
+    """Gemessene Endpunkte; der Schlüssel ist das Routen-Template, der Wert die konkrete URL."""
+    tid, pid, year = ids["tournament_id"], ids["player_id"], ids["year"]
+    # Ein Turnier Rückstand: der typische Abruf eines Clients, der kurz offline war
+    since = max(0, ids["latest_change"] - 18)
+    return {
+        "GET /api/players": "/api/players",
+        "GET /api/players/{id}": f"/api/players/{pid}",
+        "GET /api/tournaments": "/api/tournaments",
+        "GET /api/tournaments?limit=20": "/api/tournaments?limit=20",
+        "GET /api/tournaments?fields=name,year,month": "/api/tournaments?fields=name,year,month",
+        "GET /api/tournaments/{id}": f"/api/tournaments/{tid}",
+        "GET /api/tournaments/{id}/games": f"/api/tournaments/{tid}/games",
+        "GET /api/tournaments/{id}/scores": f"/api/tournaments/{tid}/scores",
+        "GET /api/tournaments/{id}/snapshot": f"/api/tournaments/{tid}/snapshot",
+        "GET /api/statistics/yearly/{year}": f"/api/statistics/yearly/{year}",
+        "GET /api/statistics/player/{id}/yearly/{year}": f"/api/statistics/player/{pid}/yearly/{year}",
+        "GET /api/changes": "/api/changes",
+        "GET /api/changes?since={seq}": f"/api/changes?since={since}",
+        "GET /api/ai/messages": "/api/ai/messages",
+        "GET /api/ai/messages/search?q=...": "/api/ai/messages/search?q=Spieler%20Punkte",
+    }
+
+
+def measure(send: Callable[[int], Any], iterations: int, before: Callable[[], None]) -> Dict[str, float]:
+    """Ruft ``send(i)`` ``iterations`` mal auf; ``send`` liefert die Antwort des Requests."""
+    timings: List[float] = []
+    queries: List[int] = []
+    for i in range(iterations):
+        before()
+        start = time.perf_counter()
+        res = send(i)
+        timings.append((time.perf_counter() - start) * 1000)
+        res.raise_for_status()
+        match = _QUERIES.search(res.headers.get("server-timing", ""))
+        queries.append(int(match.group(1)) if match else -1)
+    return summarize(timings, queries)
+
+
+def write_requests(client, ids: Dict[str, Any]) -> Dict[str, Callable[[int], Any]]:
+    """Gemessene Schreibpfade; jeder Aufruf ``i`` schreibt einen neuen Stand."""
+    tid = ids["tournament_id"]
+    games = client.get(f"/api/tournaments/{tid}/games").json()
+    first_free_year = ids["year"] + 1
+
+    def patch_game(i: int):
+        game = games[i % len(games)]
+        winner = game["pairing1_id"] if i % 2 else game["pairing2_id"]
+        return client.patch(f"/api/games/{game['id']}", json={"winner_pairing_id": winner})
+
+    def patch_games(i: int):
+        results = [
+            {"game_id": g["id"], "winner_pairing_id": g["pairing1_id"] if i % 2 else g["pairing2_id"]}
+            for g in games
+        ]
+        return client.patch(f"/api/tournaments/{tid}/games", json=results)
+
+    def create_tournament(i: int):
+        # Einzelne Turniere ab dem ersten freien Jahr, Saisons danach
+        year, month = first_free_year + i // 12, i % 12 + 1
+        return client.post("/api/tournaments", json={"name": f"Turnier {month}/{year}", "year": year, "month": month})
+
+    def create_season(i: int):
+        year = first_free_year + 1000 + i
+        return client.post("/api/tournaments/bulk", json={"tournaments": [
+            {"name": f"Turnier {month}/{year}", "year": year, "month": month} for month in range(1, 13)
+        ]})
+
+    return {
+        "PATCH /api/games/{id}": patch_game,
+        "PATCH /api/tournaments/{id}/games": patch_games,
+        "POST /api/tournaments": create_tournament,
+        "POST /api/tournaments/bulk": create_season,
+    }
+
+
+def run_size(years: int, iterations: int, workdir: str) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.database import Base, build_engine, get_db
+    from app.api.games import game_writer
+    from app.db.migrations import run_migrations
+    from app.main import app
+    from app.services.http_cache import response_cache
+    from app.services.metrics import instrument_engine
+
+    engine = build_engine(f"sqlite:///{os.path.join(workdir, f'bench_{years}y.db')}")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    instrument_engine(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    # Der Single-Writer (GAME_WRITE_QUEUE) öffnet eigene Sessions
+    default_session_factory = game_writer.session_factory
+    game_writer.session_factory = session_factory
+    response_cache.clear()
+    try:
+        client = TestClient(app)
+        seed_started = time.perf_counter()
+        ids = seed_history(client, years)
+        seed_messages(session_factory, years * MESSAGES_PER_YEAR)
+        seed_seconds = time.perf_counter() - seed_started
+
+        results = {}
+        for name, url in endpoints(ids).items():
+            client.get(url)  # Aufwärmen (Statement-Cache, Seiten-Cache)
+            results[name] = measure(lambda _, url=url: client.get(url), iterations, response_cache.clear)
+        # Schreibpfade nach den Lesepfaden, damit diese die gesäte Historie messen
+        for name, send in write_requests(client, ids).items():
+            results[name] = measure(send, iterations, lambda: None)
+    finally:
+        game_writer.stop()
+        game_writer.session_factory = default_session_factory
+        app.dependency_overrides.pop(get_db, None)
+        response_cache.clear()
+        engine.dispose()
+
+    return {
+        "tournaments": years * 12,
+        "games": years * 12 * 18,
+        "seed_seconds": round(seed_seconds, 2),
+        "endpoints": results,
+    }
+
+
+def run(sizes: Tuple[int, ...], iterations: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="kartenspiel-bench-") as workdir:
+        # app.main legt beim Import seine Standard-DB an; nicht die des Entwicklers anfassen
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'app.db')}")
+        return {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "iterations": iterations,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "sizes": {f"{years}y": run_size(years, iterations, workdir) for years in sizes},
+        }
+
+
+def compare(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    min_delta_ms: float = 3.0,
+    write_threshold: Optional[float] = None,
+) -> List[str]:
+    """
+    Liefert alle Regressionen von ``report`` gegenüber ``baseline`` als lesbare Zeilen.
+    ``write_threshold`` gilt für alle Endpunkte außer GET (Standard: ``threshold``).
+    """
+    regressions: List[str] = []
+    iterations = min(report["meta"]["iterations"], baseline.get("meta", {}).get("iterations", 0))
+    compare_timings = iterations >= MIN_TIMING_ITERATIONS
+    for size, data in report["sizes"].items():
+        base_size = baseline.get("sizes", {}).get(size)
+        if base_size is None:
+            continue
+        for name, current in data["endpoints"].items():
+            previous = base_size["endpoints"].get(name)
+            if previous is None:
+                continue
+            if current["queries"] > previous["queries"]:
+                regressions.append(
+                    f"{size} {name}: Queries {previous['queries']} -> {current['queries']}"
+                )
+            if not compare_timings:
+                continue
+            allowed = threshold if name.startswith("GET ") or write_threshold is None else write_threshold
+            limit = previous["p95_ms"] * (1 + allowed)
+            if current["p95_ms"] > limit and current["p95_ms"] - previous["p95_ms"] > min_delta_ms:
+                regressions.append(
+                    f"{size} {name}: p95 {previous['p95_ms']:.2f} ms -> {current['p95_ms']:.2f} ms"
+                    f" (> {allowed:.0%})"
+                )
+    return regressions
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    for size, data in report["sizes"].items():
+        print(f"\n{size}: {data['tournaments']} Turniere, {data['games']} Spiele")
+        for name, result in data["endpoints"].items():
+            print(
+                f"  {name:48} p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}"
+                f"  p99 {result['p99_ms']:8.2f} ms  {result['queries']:3d} Queries"
+            )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Jahre Historie, kommagetrennt (Standard: 1,5,20,50)")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output", help="Bericht als JSON hierhin schreiben")
+    parser.add_argument("--baseline", help="Gespeicherter Bericht zum Vergleich")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Erlaubter relativer p95-Anstieg (Standard: 0.25)")
+    parser.add_argument("--write-threshold", type=float, default=1.0,
+                        help="Erlaubter relativer p95-Anstieg der Schreibpfade (Standard: 1.0)")
+    parser.add_argument("--min-delta-ms", type=float, default=3.0,
+                        help="Anstiege darunter gelten als Rauschen (Standard: 3.0)")
+    parser.add_argument("--save-baseline", help="Bericht zusätzlich als neue Baseline speichern")
+    args = parser.parse_args(argv)
+
+    sizes = tuple(int(value) for value in args.sizes.split(",") if value.strip())
+    report = run(sizes, args.iterations)
+    _print_table(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as handle:
+                json.dump(report, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms, args.write_threshold)
+        if min(args.iterations, baseline["meta"]["iterations"]) < MIN_TIMING_ITERATIONS:
+            print(f"\nUnter {MIN_TIMING_ITERATIONS} Iterationen: nur Query-Anzahlen verglichen.")
+        if regressions:
+            print("\nRegressionen gegenüber der Baseline:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print("\nKeine Regression gegenüber der Baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""Lasttest eines Turnierabends gegen einen echten uvicorn-Server.
+
+Startet ``uvicorn app.main:app`` mit ``--workers`` Prozessen gegen eine frische
+SQLite-Datei (oder ``--database-url``, z.B. PostgreSQL), legt Spieler und ein
+laufendes Turnier an und erzeugt dann für ``--duration`` Sekunden die typische
+Mischlast:
+
+* ``--writers`` Handys tragen per ``PATCH /api/games/{id}`` Ergebnisse ein,
+* ``--readers`` Bildschirme pollen abwechselnd ``/scores`` und ``/games``
+  (mit ``If-None-Match`` wie ein Browser, abschaltbar über ``--no-etag``).
+
+Berichtet werden Durchsatz, p50/p95/p99/max-Latenz und Fehlerquote pro Operation
+sowie ``database is locked``-Abbrüche (aus ``/metrics`` aller Worker) und
+Schreib-Requests, die der Client nach einem 5xx wiederholen musste.
+
+Aufruf::
+
+    python -m benchmarks.load --workers 4 --writers 6 --readers 30 --duration 30
+    python -m benchmarks.load --database-url postgresql+psycopg://user:pw@localhost/bench
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+PLAYER_COUNT = 8
+WRITE_RETRIES = 3
+
+_METRIC_LINE = re.compile(r"^(db_lock_errors_total|process_pid) (\d+)", re.MULTILINE)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_schema(database_url: str) -> None:
+    """Schema und Migrationen einmal vorab anlegen, sonst rennen mehrere Worker beim Start in ``create_all``."""
+    env = {**os.environ, "DATABASE_URL": database_url}
+    subprocess.run([sys.executable, "-c", "import app.main"], env=env, check=True)
+
+
+def start_server(database_url: str, workers: int, port: int) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": database_url}
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    return subprocess.Popen(command, env=env)
+
+
+def wait_until_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server unter {base_url} ist nach {timeout:.0f}s nicht erreichbar")
+
+
+def seed(base_url: str, history_years: int) -> Dict[str, Any]:
+    """Spieler, optionale Vorjahre und das Turnier des Abends (ohne Ergebnisse)."""
+    with httpx.Client(base_url=base_url, timeout=30.0) as client:
+        for i in range(1, PLAYER_COUNT + 1):
+            client.post("/api/players", json={"name": f"Spieler {i}"}).raise_for_status()
+        this_year = time.localtime().tm_year
+        for year in range(this_year - history_years, this_year):
+            season = {"tournaments": [
+                {"name": f"Turnier {month}/{year}", "year": year, "month": month} for month in range(1, 13)
+            ]}
+            client.post("/api/tournaments/bulk", json=season).raise_for_status()
+        tournament = client.post(
+            "/api/tournaments", json={"name": "Turnierabend", "year": this_year, "month": 1},
+        )
+        tournament.raise_for_status()
+        tournament_id = tournament.json()["id"]
+        games = client.get(f"/api/tournaments/{tournament_id}/games").json()
+    return {"tournament_id": tournament_id, "games": games}
+
+
+class Recorder:
+    """Sammelt Latenzen und Status-Codes pro Operation."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.transport_errors: Dict[str, int] = defaultdict(int)
+        self.write_retries = 0
+
+    def record(self, operation: str, started: float, status: Optional[int]) -> None:
+        self.latencies[operation].append((time.perf_counter() - started) * 1000)
+        if status is None:
+            self.transport_errors[operation] += 1
+        else:
+            self.statuses[operation][status] += 1
+
+
+async def _request(client: httpx.AsyncClient, recorder: Recorder, operation: str, method: str,
+                   url: str, **kwargs) -> Optional[httpx.Response]:
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        recorder.record(operation, started, None)
+        return None
+    recorder.record(operation, started, response.status_code)
+    return response
+
+
+async def writer(client: httpx.AsyncClient, recorder: Recorder, games: List[dict],
+                 stop_at: float, think: float, rng: random.Random) -> None:
+    while time.monotonic() < stop_at:
+        game = rng.choice(games)
+        winner = rng.choice((game["pairing1_id"], game["pairing2_id"], None))
+        for attempt in range(WRITE_RETRIES):
+            response = await _request(
+                client, recorder, "patch_game", "PATCH", f"/api/games/{game['id']}",
+                json={"winner_pairing_id": winner},
+            )
+            if response is not None and response.status_code < 500:
+                break
+            # Handy schickt das Ergebnis erneut
+            recorder.write_retries += 1
+            await asyncio.sleep(0.05 * (attempt + 1))
+        await asyncio.sleep(rng.uniform(0, 2 * think))
+
+
+async def reader(client: httpx.AsyncClient, recorder: Recorder, tournament_id: int,
+                 stop_at: float, interval: float, use_etag: bool, rng: random.Random) -> None:
+    etags: Dict[str, str] = {}
+    await asyncio.sleep(rng.uniform(0, interval))
+    while time.monotonic() < stop_at:
+        for operation in ("scores", "games"):
+            url = f"/api/tournaments/{tournament_id}/{operation}"
+            headers = {"If-None-Match": etags[url]} if use_etag and url in etags else {}
+            response = await _request(client, recorder, f"get_{operation}", "GET", url, headers=headers)
+            if response is not None and "etag" in response.headers:
+                etags[url] = response.headers["etag"]
+        await asyncio.sleep(interval)
+
+
+async def run_workload(base_url: str, data: Dict[str, Any], args: argparse.Namespace) -> Recorder:
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    stop_at = time.monotonic() + args.duration
+    limits = httpx.Limits(max_connections=args.writers + args.readers)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        tasks = [
+            writer(client, recorder, data["games"], stop_at, args.writer_think, random.Random(rng.random()))
+            for _ in range(args.writers)
+        ] + [
+            reader(client, recorder, data["tournament_id"], stop_at, args.poll_interval,
+                   not args.no_etag, random.Random(rng.random()))
+            for _ in range(args.readers)
+        ]
+        await asyncio.gather(*tasks)
+    return recorder
+
+
+def scrape_lock_errors(base_url: str, workers: int) -> Dict[str, int]:
+    """Fragt ``/metrics`` so oft ab, bis jeder Worker (per PID) mindestens einmal geantwortet hat."""
+    per_worker: Dict[int, int] = {}
+    for _ in range(workers * 20):
+        # Neue Verbindung pro Abfrage, sonst bleibt Keep-Alive beim selben Worker
+        text = httpx.get(f"{base_url}/metrics", headers={"Connection": "close"}, timeout=5.0).text
+        values = dict(_METRIC_LINE.findall(text))
+        per_worker[int(values["process_pid"])] = int(values["db_lock_errors_total"])
+        if len(per_worker) >= workers:
+            break
+    return {"workers_seen": len(per_worker), "lock_errors": sum(per_worker.values())}
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def build_report(recorder: Recorder, duration: float, locks: Dict[str, int]) -> Dict[str, Any]:
+    operations = {}
+    for operation, latencies in sorted(recorder.latencies.items()):
+        ordered = sorted(latencies)
+        statuses = recorder.statuses[operation]
+        errors = sum(count for status, count in statuses.items() if status >= 500)
+        errors += recorder.transport_errors[operation]
+        operations[operation] = {
+            "requests": len(ordered),
+            "rps": round(len(ordered) / duration, 1),
+            "errors": errors,
+            "error_rate": round(errors / len(ordered), 4),
+            "not_modified": statuses.get(304, 0),
+            "mean_ms": round(statistics.mean(ordered), 2),
+            "p50_ms": round(_percentile(ordered, 0.50), 2),
+            "p95_ms": round(_percentile(ordered, 0.95), 2),
+            "p99_ms": round(_percentile(ordered, 0.99), 2),
+            "max_ms": round(ordered[-1], 2),
+        }
+    total = sum(op["requests"] for op in operations.values())
+    return {
+        "throughput_rps": round(total / duration, 1),
+        "operations": operations,
+        "write_retries": recorder.write_retries,
+        "db_lock_errors": locks["lock_errors"],
+        "workers_scraped": locks["workers_seen"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn-Worker-Prozesse")
+    parser.add_argument("--database-url", help="Standard: frische SQLite-Datei im Temp-Verzeichnis")
+    parser.add_argument("--writers", type=int, default=4, help="Gleichzeitig eintragende Handys")
+    parser.add_argument("--readers", type=int, default=20, help="Pollende Bildschirme")
+    parser.add_argument("--duration", type=float, default=20.0, help="Sekunden Last")
+    parser.add_argument("--writer-think", type=float, default=0.5, help="Mittlere Pause zwischen Eintragungen (s)")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Polling-Intervall der Bildschirme (s)")
+    parser.add_argument("--history-years", type=int, default=2, help="Vorjahre in der Datenbank")
+    parser.add_argument("--no-etag", action="store_true", help="Bildschirme senden kein If-None-Match")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Bericht als JSON hierhin schreiben")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="kartenspiel-load-") as workdir:
+        database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}"
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        prepare_schema(database_url)
+        server = start_server(database_url, args.workers, port)
+        try:
+            wait_until_ready(base_url)
+            data = seed(base_url, args.history_years)
+            started = time.monotonic()
+            recorder = asyncio.run(run_workload(base_url, data, args))
+            report = build_report(recorder, time.monotonic() - started, scrape_lock_errors(base_url, args.workers))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report["config"] = {
+        "workers": args.workers,
+        "backend": database_url.split(":", 1)[0],
+        "writers": args.writers,
+        "readers": args.readers,
+        "duration_s": args.duration,
+        "etag": not args.no_etag,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Misst die Latenz des Ollama-Aufrufs (``_generate``) gegen einen lokalen Ollama-Stub.
+
+Vergleicht einen neuen ``httpx.AsyncClient`` pro Anfrage (altes Verhalten) mit
+dem geteilten Keep-Alive-Client aus ``app.api.ai``.
+
+Aufruf: ``python -m benchmarks.ollama_client [--requests 200]``
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-Alive erlauben
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", "0"))
+        self.rfile.read(length)
+        body = json.dumps({"response": "ok", "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _measure(call: Callable, prompts: int) -> List[float]:
+    timings = []
+    for i in range(prompts):
+        start = time.perf_counter()
+        await call(f"Frage {i}")
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _summary(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "mean_ms": round(statistics.mean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1], 3),
+    }
+
+
+async def run(requests: int) -> Dict[str, Dict[str, float]]:
+    import httpx
+
+    from app.api import ai
+
+    server = start_stub_server()
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+    ai.OLLAMA_HOST = host
+
+    async def per_request_client(prompt: str) -> str:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.post(f"{host}/api/generate", json={"model": ai.OLLAMA_MODEL, "prompt": prompt})
+            response.raise_for_status()
+            return response.json()["response"]
+
+    try:
+        fresh = await _measure(per_request_client, requests)
+        await ai.close_ollama_client()
+        shared = await _measure(ai._generate, requests)
+    finally:
+        await ai.close_ollama_client()
+        server.shutdown()
+
+    return {"client_per_request": _summary(fresh), "shared_client": _summary(shared)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
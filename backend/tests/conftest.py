@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Generator, List
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.database import Base, get_db
+from app.main import app
+from app.models.player import Player
+from app.services.http_cache import response_cache
+
+
+class ApiDatabase:
+    """Eigene SQLite-Datei mit frischem Schema, über die ``get_db`` der App läuft."""
+
+    def __init__(self, path: Path) -> None:
+        self.engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.client = TestClient(app)
+
+    def override_get_db(self) -> Generator[Session, None, None]:
+        db = self.session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def use(self):
+        """Leitet ``get_db`` hierher um; gecachte Antworten anderer Datenbanken fallen weg."""
+        previous = app.dependency_overrides.get(get_db)
+        app.dependency_overrides[get_db] = self.override_get_db
+        response_cache.clear()
+        try:
+            yield self
+        finally:
+            response_cache.clear()
+            if previous is None:
+                app.dependency_overrides.pop(get_db, None)
+            else:
+                app.dependency_overrides[get_db] = previous
+
+    @contextmanager
+    def count_queries(self):
+        """Zählt die SQL-Statements, die im Block gegen diese Datenbank laufen."""
+        statements: List[str] = []
+
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(self.engine, "before_cursor_execute", _before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(self.engine, "before_cursor_execute", _before_cursor_execute)
+
+    def seed_players(self, names: List[str]) -> None:
+        with self.session_factory() as db:
+            for name in names:
+                db.add(Player(name=name))
+            db.commit()
+
+    def create_tournament(self, name: str = "Januar", year: int = 2025, month: int = 1) -> int:
+        res = self.client.post("/api/tournaments", json={"name": name, "year": year, "month": month})
+        assert res.status_code == 200, res.text
+        return res.json()["id"]
+
+
+@pytest.fixture
+def make_api_db(tmp_path):
+    """Legt weitere Datenbanken im Testverzeichnis an; ``use()`` schaltet die App darauf um."""
+    databases: List[ApiDatabase] = []
+
+    def make(name: str) -> ApiDatabase:
+        database = ApiDatabase(tmp_path / name)
+        databases.append(database)
+        return database
+
+    yield make
+    for database in databases:
+        database.engine.dispose()
+
+
+@pytest.fixture
+def api_db(make_api_db) -> Generator[ApiDatabase, None, None]:
+    """Leere Datenbank pro Test, damit weder Zeilen noch Caches zwischen Tests durchsickern."""
+    database = make_api_db("api.db")
+    with database.use():
+        yield database
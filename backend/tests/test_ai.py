@@ -0,0 +1,324 @@
+import json
+from typing import Generator, List
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api import ai
+from app.db.database import Base, get_db
+from app.main import app
+from app.models.message import Message
+from app.services.prompt_cache import prompt_cache
+
+
+@pytest.fixture(autouse=True)
+def _chat_db(tmp_path, monkeypatch):
+    """Eigene, leere Datenbank pro Test, damit gespeicherte Antworten nicht als Cache-Treffer zählen."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(ai, "SessionLocal", session_factory)
+    monkeypatch.setattr(ai.message_writer, "session_factory", session_factory)
+    prompt_cache.memory.clear()
+    yield session_factory
+    ai.message_writer.flush()
+    prompt_cache.memory.clear()
+    if previous is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = previous
+    engine.dispose()
+
+
+def _ollama_stub(requests: List[dict]) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        requests.append(payload)
+        return httpx.Response(200, json={"response": f"Antwort auf: {payload['prompt']}"})
+
+    return httpx.AsyncClient(base_url=ai.OLLAMA_HOST, transport=httpx.MockTransport(handler))
+
+
+@pytest.fixture
+def ollama_requests() -> Generator[List[dict], None, None]:
+    requests: List[dict] = []
+    ai._ollama_client = _ollama_stub(requests)
+    yield requests
+    ai._ollama_client = None
+
+
+def test_chat_uses_shared_client(ollama_requests):
+    client = TestClient(app)
+    first = client.get("/api/ai/chat", params={"message": "Wie viele Punkte gibt ein Sieg?"})
+    assert first.status_code == 200, first.text
+    assert first.json()["response"] == "Antwort auf: Wie viele Punkte gibt ein Sieg?"
+
+    shared = ai._ollama_client
+    client.get("/api/ai/chat", params={"message": "Wer führt?"})
+    assert ai._ollama_client is shared
+    assert [r["model"] for r in ollama_requests] == [ai.OLLAMA_MODEL] * 2
+
+
+def test_lifespan_closes_client():
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        shared = ai._ollama_client
+        assert shared is not None and not shared.is_closed
+    assert shared.is_closed
+    assert ai._ollama_client is None
+
+
+def test_chat_stream_forwards_chunks_as_sse(_chat_db):
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        lines = [{"response": part, "done": False} for part in ("Ein ", "Sieg ", "= 1 Punkt")]
+        lines.append({"response": "", "done": True})
+        return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines))
+
+    ai._ollama_client = httpx.AsyncClient(base_url=ai.OLLAMA_HOST, transport=httpx.MockTransport(handler))
+    try:
+        client = TestClient(app)
+        with client.stream("GET", "/api/ai/chat/stream", params={"message": "Punkte?"}) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            body = "".join(response.iter_text())
+    finally:
+        ai._ollama_client = None
+
+    events = [block for block in body.split("\n\n") if block]
+    chunks = [json.loads(e[len("data: "):])["response"] for e in events if e.startswith("data: ")]
+    assert chunks == ["Ein ", "Sieg ", "= 1 Punkt"]
+    assert events[-1].startswith("event: done")
+    assert json.loads(events[-1].split("data: ", 1)[1])["cached"] is False
+
+    ai.message_writer.flush()
+    with _chat_db() as db:
+        stored = db.query(Message).one()
+    assert stored.content == "Punkte?"
+    assert stored.response == "Ein Sieg = 1 Punkt"
+
+
+def test_repeated_prompt_is_served_from_cache(ollama_requests):
+    client = TestClient(app)
+    first = client.get("/api/ai/chat", params={"message": "Wer führt dieses Jahr?"})
+    assert first.json()["cached"] is False
+
+    again = client.get("/api/ai/chat", params={"message": "  wer FÜHRT   dieses Jahr? "})
+    assert again.status_code == 200
+    assert again.json()["cached"] is True
+    assert again.json()["response"] == first.json()["response"]
+    assert len(ollama_requests) == 1
+
+    # Nach Neustart (leerer LRU) kommt der Treffer aus der Tabelle messages
+    ai.message_writer.flush()
+    prompt_cache.memory.clear()
+    db_hits = prompt_cache.db_hits
+    from_db = client.get("/api/ai/chat", params={"message": "Wer führt dieses Jahr?"})
+    assert from_db.json()["cached"] is True
+    assert prompt_cache.db_hits == db_hits + 1
+    assert len(ollama_requests) == 1
+
+
+@pytest.mark.parametrize("body", [{"response": ""}, {"done": True}, ""])
+def test_empty_answer_is_neither_cached_nor_saved(_chat_db, body):
+    requests: List[dict] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        if isinstance(body, dict):
+            return httpx.Response(200, json=body)
+        return httpx.Response(200, content=body)
+
+    ai._ollama_client = httpx.AsyncClient(base_url=ai.OLLAMA_HOST, transport=httpx.MockTransport(handler))
+    try:
+        client = TestClient(app)
+        for _ in range(2):
+            response = client.get("/api/ai/chat", params={"message": "Wer führt?"})
+            assert response.status_code == 502
+        with client.stream("GET", "/api/ai/chat/stream", params={"message": "Wer führt?"}) as response:
+            events = [block for block in "".join(response.iter_text()).split("\n\n") if block]
+    finally:
+        ai._ollama_client = None
+
+    # Jeder Versuch geht erneut an Ollama, statt einen Platzhalter aus dem Cache zu liefern
+    assert len(requests) == 3
+    assert events[-1].startswith("event: error")
+    ai.message_writer.flush()
+    with _chat_db() as db:
+        assert db.query(Message).count() == 0
+
+
+def test_admission_gate_coalesces_and_rejects():
+    import asyncio
+
+    from app.services.admission import AdmissionGate, QueueFullError
+
+    async def scenario():
+        gate = AdmissionGate(max_in_flight=1, max_queue=1, retry_after=3)
+        release = asyncio.Event()
+        calls = []
+
+        async def upstream(label):
+            calls.append(label)
+            await release.wait()
+            return label
+
+        first = asyncio.create_task(gate.run("a", lambda: upstream("a")))
+        duplicate = asyncio.create_task(gate.run("a", lambda: upstream("a-dup")))
+        queued = asyncio.create_task(gate.run("b", lambda: upstream("b")))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError) as rejected:
+            await gate.run("c", lambda: upstream("c"))
+        assert rejected.value.retry_after == 3
+
+        release.set()
+        assert await asyncio.gather(first, duplicate, queued) == ["a", "a", "b"]
+        assert calls == ["a", "b"]
+        return gate.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["coalesced"] == 1
+    assert stats["rejected"] == 1
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+
+
+def test_admission_gate_survives_cancelled_leader():
+    import asyncio
+
+    from app.services.admission import AdmissionGate
+
+    async def scenario():
+        gate = AdmissionGate(max_in_flight=1, max_queue=1, retry_after=3)
+        release = asyncio.Event()
+        calls = []
+
+        async def upstream(label):
+            calls.append(label)
+            await release.wait()
+            return label
+
+        leader = asyncio.create_task(gate.run("a", lambda: upstream("leader")))
+        follower = asyncio.create_task(gate.run("a", lambda: upstream("follower")))
+        await asyncio.sleep(0)
+        # Client des führenden Aufrufs trennt die Verbindung
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await follower == "follower"
+        assert leader.cancelled()
+        assert calls == ["leader", "follower"]
+        return gate.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["requests"] == 2 and stats["coalesced"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_coalesced_chat_answers_are_recorded_once(_chat_db, monkeypatch):
+    import asyncio
+
+    async def slow_generate(prompt):
+        await asyncio.sleep(0.01)
+        return f"Antwort auf: {prompt}"
+
+    monkeypatch.setattr(ai, "_generate", slow_generate)
+    coalesced_hits = prompt_cache.coalesced_hits
+
+    async def scenario():
+        return await asyncio.gather(*(ai.answer_prompt("Wer gewinnt?") for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert sorted(result["cached"] for result in results) == [False, True, True]
+    assert prompt_cache.coalesced_hits == coalesced_hits + 2
+
+    ai.message_writer.flush()
+    with _chat_db() as db:
+        assert db.query(Message).count() == 1
+
+
+def test_chat_returns_429_when_queue_is_full(ollama_requests, monkeypatch):
+    from app.services.admission import AdmissionGate
+
+    full_gate = AdmissionGate(max_in_flight=0, max_queue=0, retry_after=7)
+    monkeypatch.setattr(ai, "ollama_gate", full_gate)
+    response = TestClient(app).get("/api/ai/chat", params={"message": "Regeln?"})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "7"
+    assert ollama_requests == []
+
+
+def test_message_writer_batches_and_flushes_on_stop(_chat_db):
+    from app.services.message_writer import MessageWriter
+
+    writer = MessageWriter(_chat_db, batch_size=50, flush_interval=0.5)
+    for i in range(20):
+        writer.enqueue({"content": f"Frage {i}", "response": "Antwort"})
+    writer.stop()
+
+    assert writer.stats()["written"] == 20
+    assert writer.stats()["batches"] < 20
+    with _chat_db() as db:
+        assert db.query(Message).count() == 20
+
+
+def test_message_search_ranks_snippets_and_pages(_chat_db):
+    from app.db.migrations import run_migrations
+
+    with _chat_db() as db:
+        run_migrations(db.get_bind())
+        # Je kürzer die Antwort, desto höher die Relevanz; die relevanteste ist die älteste
+        for i in range(5):
+            filler = " Details folgen." * i
+            db.add(Message(content=f"Wie zählt ein Sieg im Monat {i}?", response=f"Jeder Sieg gibt einen Punkt.{filler}"))
+        db.add(Message(content="Wer führt?", response="Spieler 3 führt."))
+        db.commit()
+
+    client = TestClient(app)
+    first = client.get("/api/ai/messages/search", params={"q": "sieg punkt", "limit": 3}).json()
+    assert len(first["items"]) == 3
+    assert "[Sieg]" in first["items"][0]["message_snippet"]
+    assert first["next_cursor"] is not None
+
+    second = client.get(
+        "/api/ai/messages/search",
+        params={"q": "sieg punkt", "limit": 3, "cursor": first["next_cursor"]},
+    ).json()
+    assert len(second["items"]) == 2
+    assert second["next_cursor"] is None
+    items = first["items"] + second["items"]
+    ranks = [item["rank"] for item in items]
+    assert ranks == sorted(ranks)
+    assert [item["id"] for item in items] == [1, 2, 3, 4, 5]
+    assert client.get("/api/ai/messages/search", params={"q": "sieg", "cursor": "kaputt"}).status_code == 400
+
+    # Sonderzeichen dürfen keine FTS-Syntaxfehler auslösen
+    assert client.get("/api/ai/messages/search", params={"q": 'führt"-('}).status_code == 200
+
+
+def test_message_history_pages_and_projects_fields(_chat_db):
+    with _chat_db() as db:
+        for i in range(5):
+            db.add(Message(content=f"Frage {i}", response=f"Antwort {i}"))
+        db.commit()
+
+    client = TestClient(app)
+    first = client.get("/api/ai/messages", params={"limit": 3, "fields": "message"}).json()
+    assert [item["message"] for item in first["items"]] == ["Frage 4", "Frage 3", "Frage 2"]
+    assert set(first["items"][0]) == {"id", "message"}
+
+    second = client.get("/api/ai/messages", params={"before_id": first["next_before_id"]}).json()
+    assert [item["response"] for item in second["items"]] == ["Antwort 1", "Antwort 0"]
+    assert second["next_before_id"] is None
@@ -0,0 +1,27 @@
+def test_changes_feed_returns_compacted_deltas(api_db):
+    client = api_db.client
+    for i in range(1, 9):
+        client.post("/api/players", json={"name": f"Player {i}"})
+    first = client.get("/api/changes").json()
+    assert len(first["players"]) == 8 and first["next"] > 0
+
+    tournament_id = api_db.create_tournament()
+    created = client.get("/api/changes", params={"since": first["next"]}).json()
+    assert [t["id"] for t in created["tournaments"]] == [tournament_id]
+    assert len(created["games"]) == 18 and created["players"] == []
+
+    game = created["games"][0]
+    client.patch(f"/api/games/{game['id']}", json={"winner_pairing_id": game["pairing1_id"]})
+    client.patch(f"/api/games/{game['id']}", json={"winner_pairing_id": game["pairing2_id"]})
+    with api_db.count_queries() as statements:
+        delta = client.get("/api/changes", params={"since": created["next"]}).json()
+    assert [g["winner_pairing_id"] for g in delta["games"]] == [game["pairing2_id"]]
+    assert delta["tournaments"] == [] and len(statements) <= 5
+
+    assert client.get("/api/changes", params={"since": delta["next"]}).json()["games"] == []
+    assert client.get("/api/changes", params={"since": delta["next"] + 100}).json()["reset"] is True
+
+    client.delete(f"/api/tournaments/{tournament_id}")
+    removed = client.get("/api/changes", params={"since": delta["next"]}).json()
+    assert removed["deleted"]["tournaments"] == [tournament_id]
+    assert len(removed["deleted"]["games"]) == 18 and removed["games"] == []
@@ -0,0 +1,24 @@
+import threading
+
+from sqlalchemy import text
+
+from app.db.database import build_engine
+
+
+def test_memory_sqlite_is_shared_across_threads():
+    engine = build_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE data_versions (scope VARCHAR PRIMARY KEY, version INTEGER)"))
+        conn.execute(text("INSERT INTO data_versions VALUES ('global', 3)"))
+
+    # Wie ein Request aus dem Threadpool: anderer Thread, gleiche Datenbank
+    seen = []
+
+    def read() -> None:
+        with engine.connect() as conn:
+            seen.append(conn.execute(text("SELECT version FROM data_versions")).scalar())
+
+    worker = threading.Thread(target=read)
+    worker.start()
+    worker.join()
+    assert seen == [3]
@@ -0,0 +1,72 @@
+import pytest
+
+from app.api import games as games_api
+from app.services.game_writer import GameNotFound, GameResultWriter, InvalidWinner
+from app.services.player_scores import rebuild_player_scores
+
+
+@pytest.fixture(autouse=True)
+def _stop_game_writer():
+    """Der App-weite Writer darf keinen Thread mit der Datenbank dieses Tests zurücklassen."""
+    yield
+    games_api.game_writer.stop()
+
+
+def test_game_write_queue_groups_results_into_one_commit(api_db, monkeypatch):
+    client = api_db.client
+    api_db.seed_players([f"Player {i}" for i in range(1, 9)])
+    tournament_id = api_db.create_tournament()
+    games = client.get(f"/api/tournaments/{tournament_id}/games").json()
+
+    # Großes Sammelfenster: alle Ergebnisse landen im selben Batch
+    writer = GameResultWriter(api_db.session_factory, window=0.5)
+    futures = [writer.submit(g["id"], g["pairing1_id"]) for g in games[:5]]
+    futures.append(writer.submit(games[0]["id"], games[0]["pairing2_id"]))
+    futures.append(writer.submit(games[1]["id"], games[0]["pairing1_id"] + 10_000))
+    futures.append(writer.submit(999_999, None))
+    assert [f.result(timeout=5) for f in futures[:6]] == [tournament_id] * 6
+    with pytest.raises(InvalidWinner):
+        futures[6].result()
+    with pytest.raises(GameNotFound):
+        futures[7].result()
+    writer.stop()
+    assert writer.stats() == {"queued": 0, "written": 6, "rejected": 2, "batches": 1, "errors": 0}
+
+    with api_db.session_factory() as db:
+        assert rebuild_player_scores(db) == []
+        db.rollback()
+    scores = client.get(f"/api/tournaments/{tournament_id}/scores").json()
+    assert sum(row["games_played"] for row in scores) == 2 * 5
+
+    # Über die API: Antwort erst nach dem Commit, also mit dem eigenen Ergebnis
+    monkeypatch.setattr(games_api, "GAME_WRITE_QUEUE", True)
+    monkeypatch.setattr(games_api.game_writer, "session_factory", api_db.session_factory)
+    game = games[5]
+    res = client.patch(f"/api/games/{game['id']}", json={"winner_pairing_id": game["pairing2_id"]})
+    assert res.status_code == 200
+    assert res.json()["winner_pairing_id"] == game["pairing2_id"]
+    assert client.patch("/api/games/999999", json={"winner_pairing_id": None}).status_code == 404
+    assert client.patch(
+        f"/api/games/{game['id']}", json={"winner_pairing_id": game["pairing1_id"] + 10_000}
+    ).status_code == 400
+
+    # Sammel-Eintragung läuft ebenfalls über den Writer, als ein Auftrag
+    written = games_api.game_writer.written
+    bulk = [{"game_id": g["id"], "winner_pairing_id": g["pairing2_id"]} for g in games[6:9]]
+    res = client.patch(f"/api/tournaments/{tournament_id}/games", json=bulk)
+    assert res.status_code == 200
+    assert [g["winner_pairing_id"] for g in res.json()["games"]] == [g["pairing2_id"] for g in games[6:9]]
+    assert sum(row["games_played"] for row in res.json()["scores"]) == 2 * 9
+    assert games_api.game_writer.written == written + 3
+
+    # Ein ungültiges Ergebnis verwirft den ganzen Auftrag
+    bad = [{"game_id": games[9]["id"], "winner_pairing_id": games[9]["pairing1_id"]},
+           {"game_id": 999_999, "winner_pairing_id": None}]
+    res = client.patch(f"/api/tournaments/{tournament_id}/games", json=bad)
+    assert res.status_code == 404
+    assert client.get(f"/api/tournaments/{tournament_id}/games").json()[9]["winner_pairing_id"] is None
+    games_api.game_writer.stop()
+
+    with api_db.session_factory() as db:
+        assert rebuild_player_scores(db) == []
+        db.rollback()
@@ -0,0 +1,45 @@
+from app.services.versioning import ensure_instance_id
+
+
+def test_conditional_get_returns_304_until_data_changes(api_db):
+    client = api_db.client
+    api_db.seed_players([f"Player {i}" for i in range(1, 9)])
+    tournament_id = api_db.create_tournament()
+
+    first = client.get(f"/api/tournaments/{tournament_id}/scores")
+    etag = first.headers["etag"]
+    with api_db.count_queries() as statements:
+        cached = client.get(f"/api/tournaments/{tournament_id}/scores", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert len(statements) == 1
+
+    yearly_etag = client.get("/api/statistics/yearly/2025").headers["etag"]
+    game = client.get(f"/api/tournaments/{tournament_id}/games").json()[0]
+    client.patch(f"/api/games/{game['id']}", json={"winner_pairing_id": game["pairing1_id"]})
+
+    changed = client.get(f"/api/tournaments/{tournament_id}/scores", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert sum(s["points"] for s in changed.json()) == 1
+    yearly = client.get("/api/statistics/yearly/2025", headers={"If-None-Match": yearly_etag})
+    assert yearly.status_code == 200
+
+
+def test_conditional_get_never_masks_missing_resources_or_other_databases(api_db, make_api_db):
+    client = api_db.client
+
+    for path in ("/api/tournaments/9999/scores", "/api/tournaments/9999/snapshot"):
+        for etag in ("*", '"tournament:9999-0-0"'):
+            assert client.get(path, headers={"If-None-Match": etag}).status_code == 404
+
+    # Gleiche Versionsnummern auf einer neu aufgesetzten Datenbank ergeben ein anderes ETag
+    etags = []
+    for name in ("a.db", "b.db"):
+        database = make_api_db(name)
+        with database.session_factory() as db:
+            ensure_instance_id(db)
+            db.commit()
+        database.seed_players([f"Player {i}" for i in range(1, 5)])
+        with database.use():
+            etags.append(client.get("/api/tournaments").headers["etag"])
+    assert etags[0] != etags[1]
@@ -0,0 +1,34 @@
+from app.api.games import refresh_live_scoreboards
+from app.models.game import Game
+from app.services.http_cache import evict_scopes, response_cache
+from app.services.invalidation import InvalidationBus
+from app.services.versioning import bump_tournament, tournament_scope
+
+
+def test_invalidation_bus_picks_up_writes_from_other_workers(api_db):
+    client = api_db.client
+    api_db.seed_players([f"Player {i}" for i in range(1, 9)])
+    tournament_id = api_db.create_tournament()
+    bus = InvalidationBus(api_db.engine)
+    bus.subscribe(evict_scopes)
+    bus.subscribe(refresh_live_scoreboards)
+    bus.poll()
+    assert bus.poll() == set()
+
+    client.get(f"/api/tournaments/{tournament_id}/scores")
+    assert len(response_cache) == 1
+
+    with client.websocket_connect(f"/api/tournaments/{tournament_id}/live") as ws:
+        game = ws.receive_json()["games"][0]
+        # Schreibzugriff eines anderen Workers: direkt in der DB, ohne Publish im eigenen Prozess
+        with api_db.session_factory() as db:
+            db.query(Game).filter(Game.id == game["id"]).update({"winner_pairing_id": game["pairing1_id"]})
+            bump_tournament(db, tournament_id)
+            db.commit()
+
+        changed = bus.poll()
+        assert changed == {"global", tournament_scope(tournament_id)}
+        assert len(response_cache) == 0
+        update = ws.receive_json()
+        assert update["games"][0]["winner_pairing_id"] == game["pairing1_id"]
+    bus.stop()
@@ -0,0 +1,33 @@
+from app.services.live_scores import scoreboard_hub
+
+
+def test_live_scoreboard_pushes_only_changed_rows(api_db):
+    client = api_db.client
+    api_db.seed_players([f"Player {i}" for i in range(1, 9)])
+    tournament_id = api_db.create_tournament()
+
+    with client.websocket_connect(f"/api/tournaments/{tournament_id}/live") as ws:
+        snapshot = ws.receive_json()
+        assert snapshot["type"] == "snapshot"
+        assert len(snapshot["games"]) == 18 and len(snapshot["scores"]) == 4
+
+        game = snapshot["games"][0]
+        client.patch(f"/api/games/{game['id']}", json={"winner_pairing_id": game["pairing2_id"]})
+        update = ws.receive_json()
+        assert update["type"] == "update"
+        assert [g["id"] for g in update["games"]] == [game["id"]]
+        assert {row["pairing_id"] for row in update["scores"]} == {game["pairing1_id"], game["pairing2_id"]}
+        winner_row = next(row for row in update["scores"] if row["pairing_id"] == game["pairing2_id"])
+        assert winner_row["points"] == 1 and winner_row["games_played"] == 1
+
+        # Gleiches Ergebnis erneut: keine Nachricht; Bulk-Änderung kommt als ein Update
+        client.patch(f"/api/games/{game['id']}", json={"winner_pairing_id": game["pairing2_id"]})
+        others = snapshot["games"][1:3]
+        client.patch(
+            f"/api/tournaments/{tournament_id}/games",
+            json=[{"game_id": g["id"], "winner_pairing_id": g["pairing1_id"]} for g in others],
+        )
+        bulk = ws.receive_json()
+        assert [g["id"] for g in bulk["games"]] == [g["id"] for g in others]
+
+    assert scoreboard_hub.stats()["channels"] == 0
@@ -0,0 +1,23 @@
+from app.services.metrics import instrument_engine, metrics_registry
+
+
+def test_server_timing_and_metrics_per_route_template(api_db):
+    client = api_db.client
+    instrument_engine(api_db.engine)
+    metrics_registry.reset()
+    api_db.seed_players([f"Player {i}" for i in range(1, 9)])
+    tournament_id = api_db.create_tournament()
+
+    with api_db.count_queries() as statements:
+        res = client.get(f"/api/tournaments/{tournament_id}/games")
+    timing = res.headers["server-timing"]
+    assert timing.startswith("db;dur=")
+    assert f'desc="{len(statements)} queries"' in timing
+
+    body = client.get("/metrics").text
+    labels = 'method="GET",route="/api/tournaments/{tournament_id}/games"'
+    assert f"http_request_db_queries_count{{{labels}}} 1" in body
+    assert f'http_request_db_queries_sum{{{labels}}} {len(statements)}' in body
+    assert f'http_requests_total{{{labels},status="200"}} 1' in body
+    assert "db_pool_checkouts_total" in body
+    assert "ollama_in_flight 0" in body
@@ -0,0 +1,86 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app import models  # noqa: F401
+from app.db.database import Base
+from app.db.migrations import MIGRATIONS, run_migrations
+
+
+def test_migrations_add_indexes_to_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+    # Alte Datenbank simulieren: Indizes fehlen noch
+    with engine.begin() as conn:
+        for table in ("games", "pairings", "tournaments"):
+            for index in inspect(conn).get_indexes(table):
+                conn.execute(text(f"DROP INDEX {index['name']}"))
+
+    applied = run_migrations(engine)
+    assert applied == [m.version for m in MIGRATIONS]
+
+    index_names = {
+        index["name"]
+        for table in ("games", "pairings", "tournaments")
+        for index in inspect(engine).get_indexes(table)
+    }
+    assert {"ix_games_tournament_winner", "uq_tournaments_year_month"} <= index_names
+
+    # Zweiter Lauf ist ein No-Op
+    assert run_migrations(engine) == []
+
+
+def test_migration_seeds_change_log_with_existing_rows(tmp_path):
+    from sqlalchemy.orm import Session
+
+    from app.services.changes import GAME, PLAYER, TOURNAMENT, changes_since
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+    # Bestand aus der Zeit vor dem Änderungsprotokoll
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO players (id, name, active) VALUES (1, 'Anna', 1), (2, 'Ben', 1)"))
+        conn.execute(text("INSERT INTO tournaments (id, name, year, month) VALUES (1, 'Januar', 2024, 1)"))
+
+    run_migrations(engine)
+    with Session(engine) as db:
+        changes = changes_since(db, 0)
+    assert changes.upserted[PLAYER] == [1, 2]
+    assert changes.upserted[TOURNAMENT] == [1]
+    assert changes.upserted[GAME] == []
+    assert not changes.has_more
+
+
+def test_unique_month_migration_reports_existing_duplicates(tmp_path):
+    import pytest
+
+    from app.db.migrations import MigrationError
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_tournaments_year_month"))
+        conn.execute(text(
+            "INSERT INTO tournaments (id, name, year, month) VALUES "
+            "(1, 'A', 2024, 3), (2, 'B', 2024, 3), (3, 'C', 2024, 4)"
+        ))
+
+    with pytest.raises(MigrationError, match=r"3/2024: IDs 1, 2"):
+        run_migrations(engine)
+    with engine.connect() as conn:
+        assert 2 not in conn.execute(text("SELECT version FROM schema_migrations")).scalars().all()
+
+
+def test_migration_claimed_by_parallel_worker_is_skipped(tmp_path, monkeypatch):
+    from app.db import migrations
+    from app.db.migrations import Migration
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}")
+    calls = []
+    race = [Migration(100, "race", lambda db: calls.append("apply"))]
+    # Ein zweiter Worker trägt die Version ein, nachdem wir applied_versions gelesen haben
+    migrations.applied_versions(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO schema_migrations (version, name) VALUES (100, 'race')"))
+    monkeypatch.setattr(migrations, "applied_versions", lambda engine: [])
+
+    assert run_migrations(engine, race) == []
+    assert calls == []
@@ -0,0 +1,26 @@
+def test_list_endpoints_page_by_cursor_and_project_fields(api_db):
+    client = api_db.client
+    api_db.seed_players([f"Player {i}" for i in range(1, 9)])
+    season = {"tournaments": [
+        {"name": f"Monat {month}", "year": 2024, "month": month} for month in range(1, 6)
+    ]}
+    assert client.post("/api/tournaments/bulk", json=season).status_code == 200
+
+    first = client.get("/api/tournaments", params={"limit": 2}).json()
+    assert [t["month"] for t in first["items"]] == [5, 4]
+    rest = client.get("/api/tournaments", params={"limit": 10, "cursor": first["next_cursor"]}).json()
+    assert [t["month"] for t in rest["items"]] == [3, 2, 1]
+    assert rest["next_cursor"] is None
+
+    with api_db.count_queries() as statements:
+        slim = client.get("/api/tournaments", params={"fields": "name,year,month"}).json()
+    assert set(slim[0]) == {"id", "name", "year", "month"}
+    assert not any("pairings" in s for s in statements)
+
+    assert client.get("/api/tournaments", params={"fields": "foo"}).status_code == 400
+
+    players = client.get("/api/players", params={"limit": 5}).json()
+    names = [p["name"] for p in players["items"]]
+    more = client.get("/api/players", params={"limit": 5, "cursor": players["next_cursor"]}).json()
+    assert names + [p["name"] for p in more["items"]] == sorted(f"Player {i}" for i in range(1, 9))
+    assert more["next_cursor"] is None
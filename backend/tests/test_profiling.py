@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import profiling
+from app.services.profiling import ProfileStore, ProfilingMiddleware, StackSampler, profile_store
+
+
+def _busy_loop(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_stack_sampler_collects_collapsed_stacks():
+    sampler = StackSampler(0.001)
+    sampler.start()
+    _busy_loop(0.05)
+    sampler.stop()
+
+    assert sampler.samples > 0
+    lines = sampler.collapsed().splitlines()
+    busy = [line for line in lines if "_busy_loop (test_profiling.py" in line]
+    assert busy
+    stack, count = busy[0].rsplit(" ", 1)
+    assert stack.split(";")[-1].startswith("_busy_loop") and int(count) > 0
+
+
+def test_profiling_is_opt_in_and_exposed_to_admins(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "geheim")
+    profile_store.clear()
+    client = TestClient(ProfilingMiddleware(app))
+
+    plain = client.get("/health", headers={"X-Profile": "1"})
+    assert "x-profile-id" not in plain.headers
+
+    res = client.get(
+        "/health",
+        headers={"X-Profile": "1", "X-Admin-Token": "geheim", "X-Request-ID": "req-42"},
+    )
+    assert res.headers["x-profile-id"] == "req-42"
+
+    admin = {"X-Admin-Token": "geheim"}
+    captures = client.get("/api/admin/profiles", headers=admin).json()
+    assert [c["request_id"] for c in captures] == ["req-42"]
+    assert captures[0]["path"] == "/health" and captures[0]["status"] == 200
+    profile = client.get("/api/admin/profiles/req-42", headers=admin)
+    assert profile.headers["content-type"].startswith("text/plain")
+
+    assert client.get("/api/admin/profiles").status_code == 404
+    assert client.get("/api/admin/profiles", headers={"X-Admin-Token": "falsch"}).status_code == 404
+    profile_store.clear()
+
+
+def test_profile_is_stored_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "geheim")
+
+    class RecordingStore(ProfileStore):
+        def add(self, capture: dict) -> None:
+            try:
+                asyncio.get_running_loop()
+                capture = {**capture, "on_event_loop": True}
+            except RuntimeError:
+                capture = {**capture, "on_event_loop": False}
+            super().add(capture)
+
+    store = RecordingStore(5)
+    client = TestClient(ProfilingMiddleware(app, store))
+    client.get("/health", headers={"X-Profile": "1", "X-Admin-Token": "geheim", "X-Request-ID": "req-7"})
+
+    capture = store.get("req-7")
+    assert capture["on_event_loop"] is False
+    assert capture["samples"] >= 0 and capture["status"] == 200
@@ -1,8 +1,9 @@
+from contextlib import contextmanager
 from typing import Generator, List
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
 from app.db.database import Base, get_db
@@ -11,6 +12,8 @@ from app.models.player import Player
 from app.models.pairing import Pairing
 from app.models.game import Game
 from app.models.tournament import Tournament
+from app.services.http_cache import response_cache
+from app.services.player_scores import rebuild_player_scores
 
 
 TEST_DB_URL = "sqlite:///./test_rotation.db"
@@ -29,21 +32,41 @@ def override_get_db() -> Generator[Session, None, None]:
 def reset_db():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
-
-
-app.dependency_overrides[get_db] = override_get_db
+    # Versionszähler beginnen wieder bei 0, gecachte Antworten wären sonst veraltet
+    response_cache.clear()
 
 
 @pytest.fixture(autouse=True)
 def _prepare_db():
     reset_db()
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
     yield
+    if previous is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = previous
     reset_db()
 
 
 client = TestClient(app)
 
 
+@contextmanager
+def count_queries():
+    """Zählt die SQL-Statements, die im Block gegen die Test-DB laufen."""
+    statements: List[str] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
 def seed_players(names: List[str]) -> None:
     with TestingSessionLocal() as db:
         for name in names:
@@ -140,3 +163,200 @@ def test_scores_and_yearly_stats():
     # Jeder Sieg bringt beiden Spielern 1 Punkt, daher doppelt so viele Punkte wie Siege
     assert sum_yearly == total_points * 2
 
+
+def test_list_games_uses_constant_number_of_queries():
+    seed_players([f"Player {i}" for i in range(1, 9)])
+    res = client.post(
+        "/api/tournaments",
+        json={"name": "Januar", "year": 2025, "month": 1},
+    )
+    tournament_id = res.json()["id"]
+    games = client.get(f"/api/tournaments/{tournament_id}/games").json()
+    client.patch(f"/api/games/{games[0]['id']}", json={"winner_pairing_id": games[0]["pairing2_id"]})
+
+    with count_queries() as statements:
+        games_res = client.get(f"/api/tournaments/{tournament_id}/games")
+    assert games_res.status_code == 200
+    assert len(games_res.json()) == 18
+    assert len(statements) <= 3
+
+    winner = games_res.json()[0]
+    assert winner["winner_pairing_id"] == winner["pairing2_id"]
+    assert winner["winner_names"] == winner["pairing2_names"]
+
+
+def test_scores_use_single_aggregate_query():
+    seed_players([f"Player {i}" for i in range(1, 9)])
+    res = client.post(
+        "/api/tournaments",
+        json={"name": "Januar", "year": 2025, "month": 1},
+    )
+    tournament_id = res.json()["id"]
+    games = client.get(f"/api/tournaments/{tournament_id}/games").json()
+    for g in games[:5]:
+        client.patch(f"/api/games/{g['id']}", json={"winner_pairing_id": g["pairing2_id"]})
+
+    with count_queries() as statements:
+        scores_res = client.get(f"/api/tournaments/{tournament_id}/scores")
+    assert scores_res.status_code == 200
+    # Versionsabfrage, Turnierprüfung, Aggregat
+    assert len(statements) == 3
+
+    scores = scores_res.json()
+    assert len(scores) == 4
+    assert sum(s["games_won"] for s in scores) == 5
+    assert sum(s["games_played"] for s in scores) == 10
+    keys = [(-s["points"], s["pairing_id"]) for s in scores]
+    assert keys == sorted(keys)
+
+
+def test_player_score_rollup_matches_games():
+    seed_players([f"Player {i}" for i in range(1, 9)])
+    for month in (1, 2):
+        res = client.post(
+            "/api/tournaments",
+            json={"name": f"Monat {month}", "year": 2025, "month": month},
+        )
+        assert res.status_code == 200
+    tournament_id = res.json()["id"]
+
+    games = client.get(f"/api/tournaments/{tournament_id}/games").json()
+    for g in games[:6]:
+        client.patch(f"/api/games/{g['id']}", json={"winner_pairing_id": g["pairing1_id"]})
+    # Gewinner wechseln und zurücksetzen
+    client.patch(f"/api/games/{games[0]['id']}", json={"winner_pairing_id": games[0]["pairing2_id"]})
+    client.patch(f"/api/games/{games[1]['id']}", json={"winner_pairing_id": None})
+
+    with TestingSessionLocal() as db:
+        assert rebuild_player_scores(db) == []
+        db.rollback()
+
+    player_id = res.json()["pairings"][0]["player1_id"]
+    details = client.get(f"/api/statistics/player/{player_id}/yearly/2025").json()
+    assert [t["month"] for t in details["tournaments"]] == [1, 2]
+    assert details["tournaments"][1]["partner"] == res.json()["pairings"][0]["player2_name"]
+    assert details["total_points"] == sum(t["points"] for t in details["tournaments"])
+
+    yearly = client.get("/api/statistics/yearly/2025").json()
+    assert sum(p["total_points"] for p in yearly) == 5 * 2
+    assert all(p["tournaments_played"] == 2 for p in yearly)
+
+    client.delete(f"/api/tournaments/{tournament_id}")
+    yearly = client.get("/api/statistics/yearly/2025").json()
+    assert all(p["tournaments_played"] == 1 for p in yearly)
+    assert client.get("/api/statistics/yearly/2024").json() == []
+
+
+def test_duplicate_tournament_month_is_rejected():
+    seed_players([f"Player {i}" for i in range(1, 9)])
+    payload = {"name": "Januar", "year": 2025, "month": 1}
+    assert client.post("/api/tournaments", json=payload).status_code == 200
+    dup = client.post("/api/tournaments", json=payload)
+    assert dup.status_code == 400
+    assert len(client.get("/api/tournaments").json()) == 1
+
+
+def test_bulk_create_season_in_one_transaction():
+    seed_players([f"Player {i}" for i in range(1, 9)])
+    season = {"tournaments": [
+        {"name": f"Monat {month}", "year": 2024, "month": month} for month in range(1, 13)
+    ]}
+    res = client.post("/api/tournaments/bulk", json=season)
+    assert res.status_code == 200, res.text
+    created = res.json()
+    assert [t["month"] for t in created] == list(range(1, 13))
+    assert all(len(t["pairings"]) == 4 for t in created)
+    assert len(client.get(f"/api/tournaments/{created[-1]['id']}/games").json()) == 18
+
+    # Ein Duplikat verwirft die gesamte Saison
+    res = client.post("/api/tournaments/bulk", json={"tournaments": [
+        {"name": "Neu", "year": 2025, "month": 1},
+        {"name": "Doppelt", "year": 2024, "month": 5},
+    ]})
+    assert res.status_code == 400
+    assert len(client.get("/api/tournaments").json()) == 12
+
+
+def test_bulk_game_results_single_commit():
+    seed_players([f"Player {i}" for i in range(1, 9)])
+    res = client.post(
+        "/api/tournaments",
+        json={"name": "Januar", "year": 2025, "month": 1},
+    )
+    tournament_id = res.json()["id"]
+    games = client.get(f"/api/tournaments/{tournament_id}/games").json()
+    payload = [{"game_id": g["id"], "winner_pairing_id": g["pairing1_id"]} for g in games]
+
+    with count_queries() as statements:
+        bulk_res = client.patch(f"/api/tournaments/{tournament_id}/games", json=payload)
+    assert bulk_res.status_code == 200, bulk_res.text
+    assert sum(1 for s in statements if s.startswith("UPDATE games")) == 1
+    body = bulk_res.json()
+    assert len(body["games"]) == 18
+    assert all(g["winner_pairing_id"] == g["pairing1_id"] for g in body["games"])
+    assert sum(s["points"] for s in body["scores"]) == 18
+    assert body["scores"] == client.get(f"/api/tournaments/{tournament_id}/scores").json()
+
+    with TestingSessionLocal() as db:
+        assert rebuild_player_scores(db) == []
+        db.rollback()
+
+    # Ungültiger Eintrag → nichts wird geschrieben
+    bad = [
+        {"game_id": games[0]["id"], "winner_pairing_id": None},
+        {"game_id": games[1]["id"], "winner_pairing_id": games[1]["pairing2_id"] + 999},
+    ]
+    assert client.patch(f"/api/tournaments/{tournament_id}/games", json=bad).status_code == 400
+    assert client.get(f"/api/tournaments/{tournament_id}/games").json()[0]["winner_pairing_id"] is not None
+
+
+def test_round_table_covers_every_partnership_once_with_byes():
+    from itertools import combinations
+
+    from app.services.rotation import round_table, select_round
+
+    for size in (4, 7, 8, 12, 13, 16):
+        roster = tuple(range(1, size + 1))
+        rounds = round_table(roster)
+        assert len(rounds) == (size if size % 2 else size - 1)
+        pairs = [pair for round_ in rounds for pair in round_.pairs]
+        assert sorted(pairs) == sorted(combinations(roster, 2))
+        for round_ in rounds:
+            seated = [p for pair in round_.pairs for p in pair] + list(round_.byes)
+            assert sorted(seated) == list(roster)
+            assert len(round_.byes) == size % 2
+    assert round_table(tuple(range(1, 9))) is round_table(tuple(range(1, 9)))
+
+    # Bereits gespielte Partnerschaften werden gemieden, auch wenn die Monatsrotation anders wäre
+    from collections import Counter
+    first = select_round(range(1, 9), month=2)
+    used = Counter(first.pairs)
+    assert select_round(range(1, 9), month=2, used_pairs=used) != first
+
+
+def test_tournament_uses_active_players_and_attendance():
+    seed_players([f"Player {i}" for i in range(1, 14)])
+    players = client.get("/api/players").json()
+    client.patch(f"/api/players/{players[-1]['id']}", json={"active": False})
+
+    res = client.post("/api/tournaments", json={"name": "Januar", "year": 2025, "month": 1})
+    assert res.status_code == 200, res.text
+    body = res.json()
+    assert len(body["pairings"]) == 6
+    assert len(client.get(f"/api/tournaments/{body['id']}/games").json()) == 15 * 3
+    seated = {p[key] for p in body["pairings"] for key in ("player1_id", "player2_id")}
+    assert players[-1]["id"] not in seated
+
+    # Ungerade Anwesenheit: ein Spieler setzt aus, keine Partnerschaft aus Januar wiederholt sich
+    attending = [p["id"] for p in players[:7]]
+    res = client.post(
+        "/api/tournaments",
+        json={"name": "Februar", "year": 2025, "month": 2, "player_ids": attending},
+    )
+    assert res.status_code == 200, res.text
+    feb = {(p["player1_id"], p["player2_id"]) for p in res.json()["pairings"]}
+    jan = {(p["player1_id"], p["player2_id"]) for p in body["pairings"]}
+    assert len(feb) == 3 and not feb & jan
+
+    too_few = {"name": "März", "year": 2025, "month": 3, "player_ids": attending[:3]}
+    assert client.post("/api/tournaments", json=too_few).status_code == 400
@@ -0,0 +1,21 @@
+def test_snapshot_matches_separate_endpoints_in_fixed_queries(api_db):
+    client = api_db.client
+    api_db.seed_players([f"Player {i}" for i in range(1, 9)])
+    tournament_id = api_db.create_tournament()
+    games = client.get(f"/api/tournaments/{tournament_id}/games").json()
+    for game in games[:5]:
+        client.patch(f"/api/games/{game['id']}", json={"winner_pairing_id": game["pairing2_id"]})
+
+    with api_db.count_queries() as statements:
+        res = client.get(f"/api/tournaments/{tournament_id}/snapshot")
+    assert res.status_code == 200
+    assert len(statements) == 4
+    snapshot = res.json()
+    assert snapshot["tournament"] == client.get(f"/api/tournaments/{tournament_id}").json()
+    assert snapshot["games"] == client.get(f"/api/tournaments/{tournament_id}/games").json()
+    assert snapshot["scores"] == client.get(f"/api/tournaments/{tournament_id}/scores").json()
+
+    etag = res.headers["etag"]
+    again = client.get(f"/api/tournaments/{tournament_id}/snapshot", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert client.get("/api/tournaments/999999/snapshot").status_code == 404
@@ -1,5 +1,5 @@
-import React, { useState, useEffect } from 'react';
-import { fetchFromApi } from './config';
+import React, { useState, useEffect, useRef } from 'react';
+import { fetchFromApi, getApiUrl } from './config';
 
 // --- LOGIN KOMPONENTE ---
 function Login({ onLogin }) {
@@ -256,15 +256,15 @@ function GamesTab({ isActive }) {
   const [games, setGames] = useState([]);
   const [scores, setScores] = useState([]);
   const [loading, setLoading] = useState(false);
+  const liveSocket = useRef(null);
 
   const loadData = async (tId) => {
-    const [gRes, sRes] = await Promise.all([
-      fetchFromApi(`/api/tournaments/${tId}/games`),
-      fetchFromApi(`/api/tournaments/${tId}/scores`)
-    ]);
-    if (gRes.ok && sRes.ok) {
-      setGames(await gRes.json());
-      setScores(await sRes.json());
+    // Spiele und Punktestand in einem Request
+    const res = await fetchFromApi(`/api/tournaments/${tId}/snapshot`);
+    if (res.ok) {
+      const snapshot = await res.json();
+      setGames(snapshot.games);
+      setScores(snapshot.scores);
     }
   };
 
@@ -287,6 +287,31 @@ function GamesTab({ isActive }) {
     }
   }, [selectedTournament]);
 
+  // Live-Updates: der Server schickt nur geänderte Spiele und Punktezeilen
+  useEffect(() => {
+    if (!selectedTournament) return undefined;
+    const socket = new WebSocket(`${getApiUrl().replace(/^http/, 'ws')}/api/tournaments/${selectedTournament}/live`);
+    liveSocket.current = socket;
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === 'snapshot') {
+        setGames(message.games);
+        setScores(message.scores);
+      } else if (message.type === 'update') {
+        const changedGames = new Map(message.games.map(g => [g.id, g]));
+        setGames(current => current.map(g => changedGames.get(g.id) || g));
+        const changedScores = new Map(message.scores.map(s => [s.pairing_id, s]));
+        setScores(current => current
+          .map(s => changedScores.get(s.pairing_id) || s)
+          .sort((a, b) => b.points - a.points || a.pairing_id - b.pairing_id));
+      }
+    };
+    return () => {
+      socket.close();
+      if (liveSocket.current === socket) liveSocket.current = null;
+    };
+  }, [selectedTournament]);
+
   const handleUpdateGame = async (gameId, winnerPairingId) => {
     const previousGames = [...games];
     setGames(current => current.map(g => g.id === gameId ? { ...g, winner_pairing_id: winnerPairingId } : g));
@@ -296,8 +321,9 @@ function GamesTab({ isActive }) {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ winner_pairing_id: winnerPairingId })
       });
-      if (response.ok) loadData(selectedTournament);
-      else setGames(previousGames);
+      if (!response.ok) setGames(previousGames);
+      // Neuen Stand liefert der Live-Kanal; neu laden nur, wenn er nicht verbunden ist
+      else if (liveSocket.current?.readyState !== WebSocket.OPEN) loadData(selectedTournament);
     } catch (err) { setGames(previousGames); }
   };
 